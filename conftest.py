@@ -0,0 +1 @@
+# puts the repository root on sys.path, so plain `pytest` finds train/
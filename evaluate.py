@@ -0,0 +1,151 @@
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+import numpy as np
+import torch
+from train.core import COLS
+from train.core import ROWS
+from train.features import STATE_SIZE
+from train.inference import InferenceEngine
+from train.model import Linear_QNet
+from train.vector_env import VectorSnakeEnv
+
+# Headless evaluation of a saved checkpoint. Thousands of seeded games are
+# played greedily on vectorized boards, optionally split across a process
+# pool, and the score distribution is reported, e.g.
+#
+#   $ python evaluate.py best61.pth --games 10000
+
+# Constants
+ACTION_SIZE = 3
+HIDDEN_SIZE = 256
+MODEL_FOLDER = './experiments'
+NUM_ENVS = 1024
+
+
+def load_model(checkpoint):
+    # a bare file name is looked up in the experiments folder
+    if not os.path.exists(checkpoint):
+        checkpoint = os.path.join(MODEL_FOLDER, checkpoint)
+    model = Linear_QNet(STATE_SIZE, HIDDEN_SIZE, ACTION_SIZE)
+    model.load_state_dict(torch.load(checkpoint))
+    return model
+
+
+def play(checkpoint, games, seed, cols=COLS, rows=ROWS, num_envs=NUM_ENVS):
+    torch.set_num_threads(1)
+    engine = InferenceEngine(load_model(checkpoint), max_batch=num_envs)
+    env = VectorSnakeEnv(min(num_envs, games), cols, rows, seed=seed)
+    # every board plays a fixed quota of games back to back, so long games
+    # still running when the short ones are done are not left out
+    quota = np.full(env.num_envs, games // env.num_envs)
+    quota[:games % env.num_envs] += 1
+    states = env.get_states()
+    scores = []
+    lengths = []
+    steps = 0
+    while quota.any():
+        # boards past their quota keep stepping but are not counted
+        steps += int((quota > 0).sum())
+        states, _, dones, final_scores = env.step(engine.act_batch(states))
+        counted = dones & (quota > 0)
+        quota -= counted
+        scores.extend(final_scores[counted])
+        lengths.extend(env.final_frames[counted])
+    return scores, lengths, steps
+
+
+def evaluate(checkpoint, games=1000, seed=0, workers=1, cols=COLS,
+             rows=ROWS):
+    start = time.perf_counter()
+    if workers > 1:
+        shares = [games // workers + (i < games % workers)
+                  for i in range(workers)]
+        ctx = mp.get_context('spawn')
+        with ctx.Pool(workers) as pool:
+            results = pool.starmap(
+                play,
+                [(checkpoint, n, seed + i, cols, rows)
+                 for i, n in enumerate(shares) if n]
+            )
+    else:
+        results = [play(checkpoint, games, seed, cols, rows)]
+    elapsed = time.perf_counter() - start
+
+    scores = np.concatenate([r[0] for r in results])
+    lengths = np.concatenate([r[1] for r in results])
+    steps = sum(r[2] for r in results)
+    percentiles = [5, 25, 50, 75, 95]
+    return dict(
+        checkpoint=checkpoint,
+        games=len(scores),
+        seed=seed,
+        board=[cols, rows],
+        mean=float(scores.mean()),
+        std=float(scores.std()),
+        min=int(scores.min()),
+        max=int(scores.max()),
+        percentiles={
+            str(p): float(v)
+            for p, v in zip(percentiles, np.percentile(scores, percentiles))
+        },
+        histogram=np.bincount(scores).tolist(),
+        mean_length=float(lengths.mean()),
+        max_length=int(lengths.max()),
+        seconds=elapsed,
+        steps_per_sec=steps / elapsed
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        'checkpoint',
+        nargs='?',
+        default='best61.pth',
+        help='checkpoint path or file name inside ./experiments'
+    )
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='processes sharing the games, each with its own boards'
+    )
+    parser.add_argument('--cols', type=int, default=COLS)
+    parser.add_argument('--rows', type=int, default=ROWS)
+    parser.add_argument(
+        '--out',
+        default=None,
+        help='write the report as JSON to this file'
+    )
+    args = parser.parse_args()
+    report = evaluate(
+        args.checkpoint,
+        args.games,
+        args.seed,
+        args.workers,
+        args.cols,
+        args.rows
+    )
+
+    print('Checkpoint : ', report['checkpoint'], end=" | ")
+    print('Games : ', report['games'])
+    print('Score : ', 'mean {:.2f} std {:.2f} min {} max {}'.format(
+        report['mean'], report['std'], report['min'], report['max']
+    ))
+    print('Percentiles : ', ' '.join(
+        'p{} {:.0f}'.format(p, v) for p, v in report['percentiles'].items()
+    ))
+    print('Episode length : ', 'mean {:.0f} max {}'.format(
+        report['mean_length'], report['max_length']
+    ))
+    print('Speed : ', '{:.0f} steps/s in {:.1f}s'.format(
+        report['steps_per_sec'], report['seconds']
+    ))
+    if args.out is not None:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
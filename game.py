@@ -1,15 +1,10 @@
 import pygame
-import random
 from enum import Enum
-from collections import namedtuple
-
-
-# Enums to limit Direction
-class Direction(Enum):
-    RIGHT = 1
-    LEFT = 2
-    UP = 3
-    DOWN = 4
+from train.core import COLS
+from train.core import ROWS
+from train.core import SnakeCore
+from train.core import Direction
+from train.renderer import Renderer
 
 
 class GParams(Enum):
@@ -29,40 +24,19 @@ class ColorParams(Enum):
     SKYBLUE = (0, 100, 255)
 
 
-class SnakeGame():
-    def __init__(self, w=640, h=480):
-        self.w = w
-        self.h = h
-
+class SnakeGame(SnakeCore):
+    def __init__(self, cols=COLS, rows=ROWS):
         # init display
-        self.display = pygame.display.set_mode((self.w, self.h))
+        self.display = pygame.display.set_mode((
+            cols * GParams.BLOCK_SIZE.value,
+            rows * GParams.BLOCK_SIZE.value
+        ))
         pygame.display.set_caption('Snakes')
         self.clock = pygame.time.Clock()
+        self.renderer = Renderer(self.display, font, GParams, ColorParams)
 
-        # init game style
-        self.direction = Direction.RIGHT
-        self.head = Point(self.w/2, self.h/2)
-        self.snake = [
-            self.head,
-            Point(self.head.x-(GParams.BLOCK_SIZE.value), self.head.y),
-            Point(self.head.x-(2*GParams.BLOCK_SIZE.value), self.head.y)
-        ]
-        self.score = 0
-        self.food = None
-        self.__place_food()
-
-    def __place_food(self):
-        x = random.randint(
-            0,
-            (self.w-GParams.BLOCK_SIZE.value)//GParams.BLOCK_SIZE.value
-        )*GParams.BLOCK_SIZE.value
-        y = random.randint(
-            0,
-            (self.h-GParams.BLOCK_SIZE.value)//GParams.BLOCK_SIZE.value
-        )*GParams.BLOCK_SIZE.value
-        self.food = Point(x, y)
-        if self.food in self.snake:
-            self.__place_food()
+        # init game style, a human player never times out
+        super().__init__(cols, rows, timeout=False)
 
     def play_step(self):
         # 1. collect user input
@@ -88,117 +62,26 @@ class SnakeGame():
                         continue
                     self.direction = Direction.DOWN
 
-        # 2. move
-        self.__move_snake(self.direction)  # update the head
-        self.snake.insert(0, self.head)
-
-        # 3. check if game over
-        game_over = False
-        if self.__is_collision():
-            game_over = True
-            return game_over, self.score
-
-        # 4. place new food or just move
-        if self.head == self.food:
-            self.score += 1
-            self.__place_food()
-        else:
-            self.snake.pop()
+        # 2. move straight along the chosen direction, check if game over,
+        # place new food or just move
+        _, game_over, score = self.step([1, 0, 0])
+        if game_over is True:
+            return game_over, score
 
-        # 5. update ui and clock
+        # 3. update ui and clock
         self.__update_ui()
         self.clock.tick(GParams.SPEED.value)
 
-        # 6. return game over and score
-        game_over = False
-        return game_over, self.score
-
-    def __is_collision(self):
-        condition1 = self.head.x > self.w - GParams.BLOCK_SIZE.value
-        condition2 = self.head.x < 0
-        condition3 = self.head.y > self.h - GParams.BLOCK_SIZE.value
-        condition4 = self.head.y < 0
-        if condition1 or condition2 or condition3 or condition4:
-            return True
-        # Snake collision starts at 1 index
-        if self.head in self.snake[1:]:
-            return True
-        return False
+        # 4. return game over and score
+        return game_over, score
 
     def __update_ui(self):
-        self.display.fill(ColorParams.BLACK.value)
-
-        for pt in self.snake:
-            pygame.draw.rect(
-                self.display,
-                ColorParams.BLUE.value,
-                pygame.Rect(
-                    pt.x,
-                    pt.y,
-                    GParams.BLOCK_SIZE.value,
-                    GParams.BLOCK_SIZE.value
-                )
-            )
-            pygame.draw.rect(
-                self.display,
-                ColorParams.SKYBLUE.value,
-                pygame.Rect(
-                    pt.x+GParams.IB_OFFSET.value,
-                    pt.y+GParams.IB_OFFSET.value,
-                    GParams.INNER_BLOCK.value,
-                    GParams.INNER_BLOCK.value
-                )
-            )
-
-        pygame.draw.rect(
-            self.display,
-            ColorParams.RED.value,
-            pygame.Rect(
-                self.food.x,
-                self.food.y,
-                GParams.BLOCK_SIZE.value,
-                GParams.BLOCK_SIZE.value
-            )
-        )
-        pygame.draw.rect(
-            self.display,
-            ColorParams.LIGHTRED.value,
-            pygame.Rect(
-                self.food.x+GParams.IB_OFFSET.value,
-                self.food.y+GParams.IB_OFFSET.value,
-                GParams.INNER_BLOCK.value,
-                GParams.INNER_BLOCK.value
-            )
-        )
-
-        text = font.render(
-            "Score : " + str(self.score),
-            True,
-            ColorParams.WHITE.value
-        )
-        self.display.blit(text, [0, 0])
-        pygame.display.flip()
-
-    def __move_snake(self, direction):
-        x = self.head.x
-        y = self.head.y
-        if direction == Direction.RIGHT:
-            x += GParams.BLOCK_SIZE.value
-        elif direction == Direction.LEFT:
-            x -= GParams.BLOCK_SIZE.value
-        elif direction == Direction.DOWN:
-            y += GParams.BLOCK_SIZE.value
-        elif direction == Direction.UP:
-            y -= GParams.BLOCK_SIZE.value
-
-        self.head = Point(x, y)
+        self.renderer.draw(self, [("Score : " + str(self.score), (0, 0))])
 
 
 if __name__ == '__main__':
     pygame.init()
 
-    # Datastructure for points
-    Point = namedtuple('Point', 'x, y')
     font = pygame.font.Font('assets/PressStart2P-Regular.ttf', 10)
 
     game = SnakeGame()
@@ -1,93 +1,96 @@
+import argparse
+import os
 import torch
 import numpy as np
 from train.environment import SnakeGameAI
-from train.environment import Direction
-from train.environment import GParams
-from train.environment import Point
+from train.features import get_state
+from train.features import STATE_SIZE
 from train.model import Linear_QNet
+from train.planner import NODES
+from train.planner import Planner
+from train.planner import PlannerPool
+from train.inference import InferenceEngine
+from train.policy_table import compile_table
+from train.policy_table import load_table
+from train.policy_table import state_index
+from train.policy_table import table_path
+from train.policy_table import verify_table
+from train.recording import EpisodeRecorder
 
 # Constants
-STATE_SIZE = 11
 ACTION_SIZE = 3
 HIDDEN_SIZE = 256
 
 
 class Agent:
-    def __init__(self):
+    def __init__(self, use_table=False):
         self.path = './experiments/best61.pth'
         self.model = Linear_QNet(STATE_SIZE, HIDDEN_SIZE, ACTION_SIZE)
         self.model.load_state_dict(torch.load(self.path))
-
-    def get_state(self, game):
-        head = game.snake[0]
-        point_l = Point(head.x - GParams.BLOCK_SIZE.value, head.y)
-        point_r = Point(head.x + GParams.BLOCK_SIZE.value, head.y)
-        point_u = Point(head.x, head.y - GParams.BLOCK_SIZE.value)
-        point_d = Point(head.x, head.y + GParams.BLOCK_SIZE.value)
-
-        dir_l = game.direction == Direction.LEFT
-        dir_r = game.direction == Direction.RIGHT
-        dir_u = game.direction == Direction.UP
-        dir_d = game.direction == Direction.DOWN
-
-        # [
-        #   danger straight , danger right, danger left,
-        #   direction left, direction right, direction up, direction down,
-        #   food left, food right, food up, food down
-        # ]
-        state = [
-            # Danger straight state
-            (dir_l and game.is_collision(point_l)) or
-            (dir_r and game.is_collision(point_r)) or
-            (dir_u and game.is_collision(point_u)) or
-            (dir_d and game.is_collision(point_d)),
-
-            # Danger right state
-            (dir_l and game.is_collision(point_u)) or
-            (dir_r and game.is_collision(point_d)) or
-            (dir_u and game.is_collision(point_r)) or
-            (dir_d and game.is_collision(point_l)),
-
-            # Danger left state
-            (dir_l and game.is_collision(point_d)) or
-            (dir_r and game.is_collision(point_u)) or
-            (dir_u and game.is_collision(point_l)) or
-            (dir_d and game.is_collision(point_r)),
-
-            # Move direction state
-            dir_l,  # direction left
-            dir_r,  # direction right
-            dir_u,  # direction up
-            dir_d,  # direction down
-
-            # Food direction state
-            game.food.x < game.head.x,  # food left
-            game.food.x > game.head.x,  # food right
-            game.food.y < game.head.y,  # food up
-            game.food.y > game.head.y   # food down
-        ]
-
-        return np.array(state, dtype=int)
+        self.engine = InferenceEngine(self.model)
+        self.table = None
+        if use_table:
+            self.table = self.load_table()
+
+    def load_table(self):
+        # compile the lookup table once, next to the checkpoint
+        if os.path.exists(table_path(self.path)):
+            table = load_table(self.path)
+        else:
+            table = compile_table(self.model)
+            np.save(table_path(self.path), table)
+        mismatches = verify_table(table, self.model)
+        if mismatches:
+            raise ValueError(
+                'policy table disagrees with the network on {} states, '
+                'delete {} to recompile it'.format(
+                    mismatches,
+                    table_path(self.path)
+                )
+            )
+        return table
+
+    def get_state(self, game, out=None):
+        return get_state(game, out)
 
     def get_action(self, state):
         # random moves : tradeoff exploration / exploitation
         final_move = [0, 0, 0]
-        initialstate = torch.tensor(state, dtype=torch.float)
-        prediction = self.model(initialstate)
-        move = torch.argmax(prediction).item()
+        if self.table is not None:
+            move = self.table[state_index(state)]
+        else:
+            move = self.engine.act(state)
         final_move[move] = 1
         return final_move
 
 
-def run():
-    agent = Agent()
-    game = SnakeGameAI(train=False)
+def run(use_table=False, record=None, plan=False, nodes=NODES, seconds=None,
+        workers=0):
+    agent = Agent(use_table)
+    recorder = None
+    if record is not None:
+        recorder = EpisodeRecorder(record)
+    game = SnakeGameAI(train=False, recorder=recorder)
+    planner = None
+    if plan and workers > 0:
+        planner = PlannerPool(
+            agent.model,
+            workers,
+            nodes=nodes,
+            seconds=seconds
+        )
+    elif plan:
+        planner = Planner(agent.model, nodes=nodes, seconds=seconds)
+    state_old = np.empty(STATE_SIZE, dtype=np.uint8)
     while True:
         # get old state
-        state_old = agent.get_state(game)
+        agent.get_state(game, state_old)
 
-        # get move
-        final_move = agent.get_action(state_old)
+        # get move, searched ahead when planning
+        if planner is not None:
+            final_move = planner.act(game)
+        else:
+            final_move = agent.get_action(state_old)
 
         # perform move and get new state
         _, done, score = game.play_step(final_move)
@@ -96,6 +99,51 @@ def run():
             print('Score : ', score)
             break
 
+    if isinstance(planner, PlannerPool):
+        planner.close()
+
 
 if __name__ == '__main__':
-    run()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--table',
+        action='store_true',
+        help='play from the compiled 2048 entry action table'
+    )
+    parser.add_argument(
+        '--record',
+        default=None,
+        help='append the game to this episode log'
+    )
+    parser.add_argument(
+        '--plan',
+        action='store_true',
+        help='search ahead with MCTS, the network as prior'
+    )
+    parser.add_argument(
+        '--nodes',
+        type=int,
+        default=NODES,
+        help='simulations per move when planning'
+    )
+    parser.add_argument(
+        '--seconds',
+        type=float,
+        default=None,
+        help='time budget per move when planning'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=0,
+        help='planner processes splitting the root moves'
+    )
+    args = parser.parse_args()
+    run(
+        use_table=args.table,
+        record=args.record,
+        plan=args.plan,
+        nodes=args.nodes,
+        seconds=args.seconds,
+        workers=args.workers
+    )
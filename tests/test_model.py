@@ -0,0 +1,80 @@
+import copy
+import numpy as np
+import torch
+from train.model import Linear_QNet
+from train.model import QTrainer
+
+# QTrainer.train_step builds the Bellman target for the whole batch at
+# once. These tests pin it to the original per-row loop.
+
+GAMMA = 0.9
+LR = 0.001
+
+
+def batch(n=64, seed=0):
+    rng = np.random.default_rng(seed)
+    states = rng.integers(0, 2, (n, 11)).astype(np.float32)
+    actions = np.eye(3, dtype=np.int64)[rng.integers(0, 3, n)]
+    rewards = rng.choice([-10.0, 0.0, 10.0], n).astype(np.float32)
+    next_states = rng.integers(0, 2, (n, 11)).astype(np.float32)
+    dones = rng.random(n) < 0.3
+    return states, actions, rewards, next_states, dones
+
+
+def reference_step(model, optimizer, state, action, reward, next_state,
+                   done):
+    # the original per-row loop, with the action taken per row and the
+    # next state Q values kept out of the graph
+    state = torch.tensor(state, dtype=torch.float)
+    next_state = torch.tensor(next_state, dtype=torch.float)
+    pred = model(state)
+    target = pred.detach().clone()
+    for idx in range(len(done)):
+        q_new = float(reward[idx])
+        if not done[idx]:
+            with torch.no_grad():
+                q_new = float(reward[idx]) + GAMMA * float(
+                    torch.max(model(next_state[idx]))
+                )
+        target[idx][int(np.argmax(action[idx]))] = q_new
+    optimizer.zero_grad()
+    loss = torch.nn.MSELoss()(target, pred)
+    loss.backward()
+    optimizer.step()
+
+
+def test_train_step_matches_per_row_reference():
+    torch.manual_seed(0)
+    model = Linear_QNet(11, 256, 3)
+    reference = copy.deepcopy(model)
+    trainer = QTrainer(model, lr=LR, gamma=GAMMA)
+    optimizer = torch.optim.Adam(reference.parameters(), lr=LR)
+
+    data = batch()
+    assert data[1].argmax(axis=1).min() == 0
+    assert data[1].argmax(axis=1).max() == 2
+    assert data[4].any() and not data[4].all()
+
+    for _ in range(3):
+        trainer.train_step(*data)
+        reference_step(reference, optimizer, *data)
+    for p, q in zip(model.parameters(), reference.parameters()):
+        assert torch.allclose(p, q, atol=1e-6)
+
+
+def test_train_step_single_sample():
+    torch.manual_seed(0)
+    model = Linear_QNet(11, 256, 3)
+    reference = copy.deepcopy(model)
+    trainer = QTrainer(model, lr=LR, gamma=GAMMA)
+    optimizer = torch.optim.Adam(reference.parameters(), lr=LR)
+
+    states, actions, rewards, next_states, dones = batch(1)
+    trainer.train_step(
+        states[0], actions[0], rewards[0], next_states[0], dones[0]
+    )
+    reference_step(
+        reference, optimizer, states, actions, rewards, next_states, dones
+    )
+    for p, q in zip(model.parameters(), reference.parameters()):
+        assert torch.allclose(p, q, atol=1e-6)
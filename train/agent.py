@@ -1,96 +1,109 @@
+import argparse
 import torch
 import random
 import numpy as np
-from collections import deque
+from train.checkpoint import Checkpointer
+from train.core import COLS
+from train.core import ROWS
 from train.environment import SnakeGameAI
-from train.environment import Direction
-from train.environment import GParams
-from train.environment import Point
+from train.features import get_state
+from train.features import STATE_SIZE
 from train.model import Linear_QNet
 from train.model import QTrainer
-from train.helper import plot
+from train.inference import InferenceEngine
+from train.replay import ReplayBuffer
+from train.replay import PrioritizedReplayBuffer
+from train.replay_store import ReplayStore
+from train.metrics import MetricsLogger
+from train.profiling import PhaseTimer
+from train.profiling import ProfileCapture
+from train.recording import EpisodeRecorder
 
 # Constants
 MAX_MEMORY = 100_000
 BATCH_SIZE = 1000
 LR = 0.001
-STATE_SIZE = 11
 ACTION_SIZE = 3
 HIDDEN_SIZE = 256
+METRICS_PATH = './experiments/metrics.csv'
+PLOT_INTERVAL = 10
+CHECKPOINT_INTERVAL = 50
 
 
 class Agent:
-    def __init__(self):
+    def __init__(self, prioritized=False, target_update=None, tau=None,
+                 double=False):
+        # checked here, the trainer is only built at the first train step
+        if double and target_update is None and tau is None:
+            raise ValueError('double DQN needs target_update or tau')
         self.generation = 0
         self.epsilon = 0  # randomness
         self.gamma = 0.9  # discount rate
-        self.memory = deque(maxlen=MAX_MEMORY)  # popleft()
+        self.prioritized = prioritized
+        if self.prioritized:
+            self.memory = PrioritizedReplayBuffer(MAX_MEMORY, STATE_SIZE)
+        else:
+            self.memory = ReplayBuffer(MAX_MEMORY, STATE_SIZE)
         self.model = Linear_QNet(STATE_SIZE, HIDDEN_SIZE, ACTION_SIZE)
-        self.trainer = QTrainer(self.model, lr=LR, gamma=self.gamma)
-
-    def get_state(self, game):
-        head = game.snake[0]
-        point_l = Point(head.x - GParams.BLOCK_SIZE.value, head.y)
-        point_r = Point(head.x + GParams.BLOCK_SIZE.value, head.y)
-        point_u = Point(head.x, head.y - GParams.BLOCK_SIZE.value)
-        point_d = Point(head.x, head.y + GParams.BLOCK_SIZE.value)
-
-        dir_l = game.direction == Direction.LEFT
-        dir_r = game.direction == Direction.RIGHT
-        dir_u = game.direction == Direction.UP
-        dir_d = game.direction == Direction.DOWN
-
-        # [
-        #   danger straight , danger right, danger left,
-        #   direction left, direction right, direction up, direction down,
-        #   food left, food right, food up, food down
-        # ]
-        state = [
-            # Danger straight state
-            (dir_l and game.is_collision(point_l)) or
-            (dir_r and game.is_collision(point_r)) or
-            (dir_u and game.is_collision(point_u)) or
-            (dir_d and game.is_collision(point_d)),
-
-            # Danger right state
-            (dir_l and game.is_collision(point_u)) or
-            (dir_r and game.is_collision(point_d)) or
-            (dir_u and game.is_collision(point_r)) or
-            (dir_d and game.is_collision(point_l)),
-
-            # Danger left state
-            (dir_l and game.is_collision(point_d)) or
-            (dir_r and game.is_collision(point_u)) or
-            (dir_u and game.is_collision(point_l)) or
-            (dir_d and game.is_collision(point_r)),
-
-            # Move direction state
-            dir_l,  # direction left
-            dir_r,  # direction right
-            dir_u,  # direction up
-            dir_d,  # direction down
-
-            # Food direction state
-            game.food.x < game.head.x,  # food left
-            game.food.x > game.head.x,  # food right
-            game.food.y < game.head.y,  # food up
-            game.food.y > game.head.y   # food down
-        ]
+        self.engine = InferenceEngine(self.model)
+        self.trainer_options = dict(
+            target_update=target_update,
+            tau=tau,
+            double=double
+        )
+        self._trainer = None
+
+    @property
+    def trainer(self):
+        # building the optimizer imports torch._dynamo, seconds of startup
+        # that acting only processes such as the actors never need
+        if self._trainer is None:
+            self._trainer = QTrainer(
+                self.model,
+                lr=LR,
+                gamma=self.gamma,
+                **self.trainer_options
+            )
+        return self._trainer
+
+    def get_state(self, game, out=None):
+        return get_state(game, out)
 
-        return np.array(state, dtype=int)
+    def state_dict(self):
+        return dict(
+            generation=self.generation,
+            model=self.model.state_dict(),
+            trainer=self.trainer.state_dict(),
+            memory=self.memory.state_dict()
+        )
+
+    def load_state_dict(self, state):
+        self.generation = state['generation']
+        self.model.load_state_dict(state['model'])
+        self.trainer.load_state_dict(state['trainer'])
+        self.memory.load_state_dict(state['memory'])
 
     def remember(self, state, action, reward, next_state, done):
-        # pop left if MAX_MEMORY is reached
-        self.memory.append((state, action, reward, next_state, done))
+        # overwrites the oldest transition once MAX_MEMORY is reached
+        self.memory.push(state, action, reward, next_state, done)
 
     def train_long_memory(self):
-        if len(self.memory) > BATCH_SIZE:
-            # list of tuples
-            mini_sample = random.sample(self.memory, BATCH_SIZE)
+        if self.prioritized:
+            states, actions, rewards, next_states, done, idx, weights = (
+                self.memory.sample(BATCH_SIZE)
+            )
         else:
-            mini_sample = self.memory
-        states, actions, rewards, next_states, done = zip(*mini_sample)
-        self.trainer.train_step(states, actions, rewards, next_states, done)
+            states, actions, rewards, next_states, done = self.memory.sample(
+                BATCH_SIZE
+            )
+            weights = None
+        # the trainer takes one hot actions
+        actions = np.eye(ACTION_SIZE, dtype=np.int64)[actions]
+        td_errors = self.trainer.train_step(
+            states, actions, rewards, next_states, done, weights
+        )
+        if self.prioritized:
+            self.memory.update_priorities(idx, td_errors)
 
     def train_short_memory(self, state, action, reward, next_state, done):
         self.trainer.train_step(state, action, reward, next_state, done)
@@ -103,30 +116,82 @@ class Agent:
             move = random.randint(0, 2)
             final_move[move] = 1
         else:
-            initialstate = torch.tensor(state, dtype=torch.float)
-            prediction = self.model(initialstate)
-            move = torch.argmax(prediction).item()
+            move = self.engine.act(state)
             final_move[move] = 1
         return final_move
 
 
-def train():
-    plot_scores = []
-    plot_mean_scores = []
-    total_score = 0
+def save_training_state(checkpointer, agent, game, record, metrics):
+    state = agent.state_dict()
+    # replay arrays go to their own memory mappable files
+    arrays = state['memory'].pop('arrays')
+    state['record'] = record
+    state['metrics'] = metrics.state_dict()
+    state['rng'] = dict(
+        python=random.getstate(),
+        torch=torch.get_rng_state(),
+        game=game.rng.getstate()
+    )
+    checkpointer.save('gen-{:06d}'.format(agent.generation), state, arrays)
+
+
+def load_training_state(checkpointer, agent, game, metrics):
+    # record of the resumed run, 0 when there is nothing to resume
+    state, arrays = checkpointer.load()
+    if state is None:
+        return 0
+    state['memory']['arrays'] = arrays
+    agent.load_state_dict(state)
+    metrics.load_state_dict(state['metrics'])
+    random.setstate(state['rng']['python'])
+    torch.set_rng_state(state['rng']['torch'])
+    game.rng.setstate(state['rng']['game'])
+    game.reset(agent.generation, state['record'])
+    print('Resumed : ', 'generation', agent.generation, end=" | ")
+    print('Record : ', state['record'])
+    return state['record']
+
+
+def train(headless=False, metrics_path=METRICS_PATH, plot_interval=None,
+          plot_process=False, profile=0, resume=False,
+          checkpoint_interval=CHECKPOINT_INTERVAL, replay_store=None,
+          cols=COLS, rows=ROWS, record_episodes=None, **agent_options):
+    if plot_interval is None:
+        plot_interval = 0 if headless else PLOT_INTERVAL
+    metrics = MetricsLogger(
+        metrics_path,
+        plot_interval,
+        plot_process=plot_process
+    )
     record = 0
-    agent = Agent()
-    game = SnakeGameAI()
+    agent = Agent(**agent_options)
+    recorder = None
+    if record_episodes is not None:
+        recorder = EpisodeRecorder(record_episodes)
+    game = SnakeGameAI(cols, rows, headless=headless, recorder=recorder)
+    checkpointer = Checkpointer()
+    store = None
+    if replay_store is not None:
+        store = ReplayStore(replay_store)
+    if resume:
+        record = load_training_state(checkpointer, agent, game, metrics)
+    # two state buffers swapped every step, nothing is allocated per frame
+    state_old = agent.get_state(game)
+    state_new = np.empty_like(state_old)
+    timer = PhaseTimer()
+    capture = ProfileCapture(profile)
+    # ticked once up front, so --profile N starts with this generation
+    capture.tick(agent.generation)
     while True:
-        # get old state
-        state_old = agent.get_state(game)
-
         # get move
         final_move = agent.get_action(state_old)
+        timer.lap('action')
 
         # perform move and get new state
         reward, done, score = game.play_step(final_move)
-        state_new = agent.get_state(game)
+        timer.lap('env')
+        agent.get_state(game, state_new)
+        timer.lap('state')
 
         # train short memory
         agent.train_short_memory(
@@ -139,27 +204,200 @@ def train():
 
         # remember
         agent.remember(state_old, final_move, reward, state_new, done)
+        timer.lap('short')
+        timer.count('steps')
+
+        # the new state is the next step's old state
+        state_old, state_new = state_new, state_old
 
         if done:
+            if store is not None:
+                # persist the finished game, the newest transitions in memory
+                steps = min(game.frame_iteration, len(agent.memory))
+                store.append_packed(agent.memory.transitions[
+                    (agent.memory.cursor - steps + np.arange(steps))
+                    % agent.memory.capacity
+                ])
+                timer.lap('store')
+
             # train long memory, plot result
             game.reset(agent.generation, record)
+            agent.get_state(game, state_old)
+            timer.lap('env')
             agent.generation += 1
             agent.train_long_memory()
+            timer.lap('long')
 
             if score > record:
                 record = score
-                agent.model.save()
+                checkpointer.save_model(agent.model)
+                timer.lap('checkpoint')
 
             print('Generation : ', agent.generation, end=" | ")
             print('Score : ', score, end=" | ")
             print('Record : ', record)
 
-            plot_scores.append(score)
-            total_score += score
-            mean_score = total_score / agent.generation
-            plot_mean_scores.append(mean_score)
-            plot(plot_scores, plot_mean_scores)
+            metrics.log(score, record)
+            timer.lap('metrics')
+
+            # after logging, so the metrics are at the agent's generation
+            if agent.generation % checkpoint_interval == 0:
+                save_training_state(
+                    checkpointer, agent, game, record, metrics
+                )
+                timer.lap('checkpoint')
+            print('Timing : ', timer.summary())
+            capture.tick(agent.generation)
 
 
 if __name__ == '__main__':
-    train()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--headless',
+        action='store_true',
+        help='disable rendering and frame limiting'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=0,
+        help='number of headless actor processes, 0 trains in process'
+    )
+    parser.add_argument(
+        '--sync-interval',
+        type=int,
+        default=10,
+        help='generations between weight broadcasts to the actors'
+    )
+    parser.add_argument(
+        '--prioritized',
+        action='store_true',
+        help='sample long memory with prioritized experience replay'
+    )
+    parser.add_argument(
+        '--target-update',
+        type=int,
+        default=None,
+        help='train steps between hard target network copies'
+    )
+    parser.add_argument(
+        '--tau',
+        type=float,
+        default=None,
+        help='Polyak rate for a soft updated target network'
+    )
+    parser.add_argument(
+        '--double',
+        action='store_true',
+        help='Double DQN targets, needs --target-update or --tau'
+    )
+    parser.add_argument(
+        '--metrics',
+        default=METRICS_PATH,
+        help='CSV or JSONL (by extension) log of every generation'
+    )
+    parser.add_argument(
+        '--plot-interval',
+        type=int,
+        default=None,
+        help='generations between plots, 0 disables plotting'
+    )
+    parser.add_argument(
+        '--plot-process',
+        action='store_true',
+        help='draw plots in a separate process'
+    )
+    parser.add_argument(
+        '--profile',
+        type=int,
+        default=0,
+        help='cProfile the first N generations, SIGUSR1 captures later'
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='continue from the latest checkpoint in experiments/resume'
+    )
+    parser.add_argument(
+        '--checkpoint-interval',
+        type=int,
+        default=None,
+        help='generations between resumable training checkpoints, {} by '
+        'default'.format(CHECKPOINT_INTERVAL)
+    )
+    parser.add_argument(
+        '--replay-store',
+        default=None,
+        help='also append every transition to this on-disk replay store'
+    )
+    parser.add_argument(
+        '--cols',
+        type=int,
+        default=COLS,
+        help='board width in cells'
+    )
+    parser.add_argument(
+        '--rows',
+        type=int,
+        default=ROWS,
+        help='board height in cells'
+    )
+    parser.add_argument(
+        '--record',
+        default=None,
+        help='append every episode to this episode log'
+    )
+    args = parser.parse_args()
+    if args.double and args.target_update is None and args.tau is None:
+        parser.error('--double needs --target-update or --tau')
+    if args.workers > 0:
+        # not supported by the actor / learner loop yet
+        unsupported = [
+            flag for flag, value in [
+                ('--headless', args.headless),
+                ('--profile', args.profile),
+                ('--resume', args.resume),
+                ('--checkpoint-interval', args.checkpoint_interval),
+                ('--record', args.record)
+            ] if value
+        ]
+        if unsupported:
+            parser.error('--workers does not support {}'.format(
+                ', '.join(unsupported)
+            ))
+    if args.checkpoint_interval is None:
+        args.checkpoint_interval = CHECKPOINT_INTERVAL
+    board_options = dict(cols=args.cols, rows=args.rows)
+    metrics_options = dict(
+        metrics_path=args.metrics,
+        plot_interval=args.plot_interval,
+        plot_process=args.plot_process
+    )
+    agent_options = dict(
+        prioritized=args.prioritized,
+        target_update=args.target_update,
+        tau=args.tau,
+        double=args.double
+    )
+    if args.workers > 0:
+        from train.parallel import train_parallel
+        train_parallel(
+            args.workers,
+            args.sync_interval,
+            replay_store=args.replay_store,
+            **board_options,
+            **metrics_options,
+            **agent_options
+        )
+    else:
+        train(
+            headless=args.headless,
+            profile=args.profile,
+            resume=args.resume,
+            checkpoint_interval=args.checkpoint_interval,
+            replay_store=args.replay_store,
+            record_episodes=args.record,
+            **board_options,
+            **metrics_options,
+            **agent_options
+        )
@@ -0,0 +1,307 @@
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+import torch
+from train.agent import Agent
+from train.agent import BATCH_SIZE
+from train.agent import MAX_MEMORY
+from train.core import CLOCK_WISE
+from train.core import Point
+from train.environment import SnakeGameAI
+from train.features import STATE_SIZE
+from train.features import STEPS
+from train.vector_env import VectorSnakeEnv
+
+# Reproducible micro benchmarks of the training hot paths. Every case runs
+# with fixed seeds and fixed snake lengths and reports calls per second,
+# microseconds per call and the peak Python memory allocated while running,
+# and the whole report is written as JSON so runs can be diffed across
+# commits, e.g.
+#
+#   $ python -m train.benchmark --out bench.json
+
+SEED = 0
+# fraction of the board covered by the snake
+LENGTHS = {'short': 0.0, 'medium': 0.25, 'near_full': 0.9}
+
+
+def seed_everything(seed=SEED):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def serpentine(cols, rows):
+    # boustrophedon walk over the board, row by row
+    for y in range(rows):
+        xs = range(cols) if y % 2 == 0 else range(cols - 1, -1, -1)
+        for x in xs:
+            yield x, y
+
+
+def build_snake(game, fraction):
+    # lay a snake of a fixed length along the serpentine walk, head last
+    game.reset()
+    length = max(3, int(fraction * game.cols * game.rows))
+    cells = list(serpentine(game.cols, game.rows))[:length]
+    while game.snake:
+        game._pop()
+    for x, y in cells:
+        game._push(Point(x, y))
+    game.head = game.snake[0]
+    (px, py), (hx, hy) = cells[-2], cells[-1]
+    game.direction = CLOCK_WISE[STEPS.index((hx - px, hy - py))]
+    game._place_food()
+    game.frame_iteration = 0
+    return game
+
+
+def measure(name, fn, calls, steps_per_call=1, **info):
+    # warm up, then time and trace allocations in separate passes
+    fn(min(calls, 10))
+    start = time.perf_counter()
+    elapsed = fn(calls)
+    if elapsed is None:
+        elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn(min(calls, 1000))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result = dict(
+        name=name,
+        calls=calls,
+        us_per_call=elapsed / calls * 1e6,
+        steps_per_sec=calls * steps_per_call / elapsed,
+        peak_alloc_kib=peak / 1024,
+        **info
+    )
+    print('{name:<24} {length:<10} {us_per_call:>12.2f} us/call '
+          '{steps_per_sec:>14.0f} steps/s {peak_alloc_kib:>10.1f} KiB'
+          .format(**{'length': '', **result}))
+    return result
+
+
+def bench_play_step(fraction, calls):
+    seed_everything()
+    game = build_snake(SnakeGameAI(headless=True, seed=SEED), fraction)
+    rng = random.Random(SEED)
+    moves = [[1, 0, 0], [0, 1, 0], [0, 0, 1]]
+    actions = [moves[rng.choice((0, 0, 0, 1, 2))] for _ in range(calls)]
+
+    def run(n):
+        # only play_step is timed, rebuilding a finished game is not
+        elapsed = 0.0
+        for action in actions[:n]:
+            start = time.perf_counter()
+            done = game.play_step(action)[1]
+            elapsed += time.perf_counter() - start
+            if done:
+                build_snake(game, fraction)
+        return elapsed
+    return run
+
+
+def bench_get_state(fraction):
+    seed_everything()
+    agent = Agent()
+    game = build_snake(SnakeGameAI(headless=True, seed=SEED), fraction)
+    out = np.empty(STATE_SIZE, dtype=np.uint8)
+
+    def run(n):
+        for _ in range(n):
+            agent.get_state(game, out)
+    return run
+
+
+def random_transitions(n):
+    rng = np.random.default_rng(SEED)
+    return (
+        rng.integers(0, 2, (n, STATE_SIZE), dtype=np.uint8),
+        np.eye(3, dtype=np.int64)[rng.integers(0, 3, n)],
+        rng.choice([-10.0, 0.0, 10.0], n).astype(np.float32),
+        rng.integers(0, 2, (n, STATE_SIZE), dtype=np.uint8),
+        rng.random(n) < 0.05
+    )
+
+
+def bench_train_step(batch_size):
+    seed_everything()
+    agent = Agent()
+    batch = random_transitions(batch_size)
+    if batch_size == 1:
+        batch = tuple(x[0] for x in batch)
+
+    def run(n):
+        for _ in range(n):
+            agent.trainer.train_step(*batch)
+    return run
+
+
+def bench_train_long_memory():
+    seed_everything()
+    agent = Agent()
+    states, actions, rewards, next_states, dones = random_transitions(
+        MAX_MEMORY
+    )
+    agent.memory.push_batch(
+        states, np.argmax(actions, axis=1), rewards, next_states, dones
+    )
+
+    def run(n):
+        for _ in range(n):
+            agent.train_long_memory()
+    return run
+
+
+def bench_vector_step(num_envs):
+    env = VectorSnakeEnv(num_envs, seed=SEED)
+    rng = np.random.default_rng(SEED)
+    actions = rng.integers(0, 3, (64, num_envs))
+
+    def run(n):
+        for i in range(n):
+            env.step(actions[i % len(actions)])
+    return run
+
+
+# cold start cases : fresh interpreter up to the first step
+COLD_STARTS = {
+    'python': 'pass',
+    'actor': (
+        'from train.agent import Agent\n'
+        'from train.environment import SnakeGameAI\n'
+        'agent = Agent()\n'
+        'game = SnakeGameAI(headless=True)\n'
+        'state = agent.get_state(game)\n'
+        'game.play_step(agent.get_action(state))'
+    ),
+    'train_headless': (
+        'from train.agent import Agent\n'
+        'from train.environment import SnakeGameAI\n'
+        'agent = Agent()\n'
+        'game = SnakeGameAI(headless=True)\n'
+        'state = agent.get_state(game)\n'
+        'action = agent.get_action(state)\n'
+        'reward, done, _ = game.play_step(action)\n'
+        'agent.train_short_memory(\n'
+        '    state, action, reward, agent.get_state(game), done\n'
+        ')'
+    ),
+    'evaluate': (
+        'from evaluate import play\n'
+        'play("best61.pth", 1, 0, num_envs=1)'
+    )
+}
+# modules a headless process should never load
+HEAVY_MODULES = ('pygame', 'matplotlib', 'IPython')
+
+
+def measure_cold_start(name, code, repeats=3):
+    # best wall time of a new interpreter running `code`, which also
+    # reports the heavy modules it ended up importing
+    code += (
+        '\nimport sys'
+        '\nprint(",".join(m for m in {!r} if m in sys.modules))'
+    ).format(HEAVY_MODULES)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = subprocess.check_output(
+            [sys.executable, '-c', code],
+            stderr=subprocess.DEVNULL
+        )
+        times.append(time.perf_counter() - start)
+        loaded = output.decode().strip().splitlines()[-1:]
+    result = dict(
+        name='cold_start',
+        case=name,
+        seconds=min(times),
+        heavy_modules=[m for m in ''.join(loaded).split(',') if m]
+    )
+    print('{:<24} {:<16} {:>10.3f} s {}'.format(
+        'cold_start', name, result['seconds'],
+        ' '.join(result['heavy_modules'])
+    ))
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(scale=1.0):
+    def n(calls):
+        return max(1, int(calls * scale))
+
+    torch.set_num_threads(1)
+    results = []
+    for length, fraction in LENGTHS.items():
+        results.append(measure(
+            'play_step', bench_play_step(fraction, n(20_000)), n(20_000),
+            length=length
+        ))
+        results.append(measure(
+            'get_state', bench_get_state(fraction), n(20_000),
+            length=length
+        ))
+    results.append(measure(
+        'train_step', bench_train_step(1), n(2_000), batch_size=1
+    ))
+    results.append(measure(
+        'train_step', bench_train_step(BATCH_SIZE), n(200),
+        steps_per_call=BATCH_SIZE, batch_size=BATCH_SIZE
+    ))
+    results.append(measure(
+        'train_long_memory', bench_train_long_memory(), n(200),
+        steps_per_call=BATCH_SIZE, batch_size=BATCH_SIZE
+    ))
+    results.append(measure(
+        'vector_env.step', bench_vector_step(1024), n(200),
+        steps_per_call=1024, num_envs=1024
+    ))
+    for name, code in COLD_STARTS.items():
+        results.append(measure_cold_start(name, code))
+    return dict(
+        meta=dict(
+            commit=git_revision(),
+            time=time.strftime('%Y-%m-%dT%H:%M:%S'),
+            python=sys.version.split()[0],
+            platform=platform.platform(),
+            numpy=np.__version__,
+            torch=torch.__version__,
+            seed=SEED
+        ),
+        results=results
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--out',
+        default=None,
+        help='write the JSON report to this file'
+    )
+    parser.add_argument(
+        '--scale',
+        type=float,
+        default=1.0,
+        help='multiply the number of calls of every case'
+    )
+    args = parser.parse_args()
+    report = run_benchmarks(args.scale)
+    if args.out is not None:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,101 @@
+import copy
+import os
+import queue
+import shutil
+import threading
+import numpy as np
+import torch
+
+# Resumable training state written from a background thread. The caller
+# only pays for taking a copy of the state, the disk writes happen while
+# training goes on. Every checkpoint is written into a temporary folder
+# which is renamed into place once complete, and the `latest` pointer file
+# is replaced atomically afterwards, so a preempted run always finds a
+# whole checkpoint to resume from:
+#
+#   experiments/resume/
+#       latest               name of the newest complete checkpoint
+#       gen-000120/
+#           state.pt         weights, optimizer, counters and RNG states
+#           replay/*.npy     replay arrays, loaded memory mapped
+
+RESUME_FOLDER = './experiments/resume'
+
+
+class Checkpointer():
+    def __init__(self, folder=RESUME_FOLDER, keep=2):
+        self.folder = folder
+        self.keep = keep
+        self.jobs = queue.Queue()
+        self.worker = threading.Thread(target=self._work, daemon=True)
+        self.worker.start()
+
+    def _work(self):
+        while True:
+            job, args = self.jobs.get()
+            try:
+                job(*args)
+            except Exception as e:
+                # a failed write must not stop the following checkpoints
+                print('Checkpoint failed : ', repr(e))
+            finally:
+                self.jobs.task_done()
+
+    def save_model(self, model, file_name='model.pth'):
+        # Linear_QNet.save from the background thread, on a weights copy
+        weights = copy.deepcopy(model)
+        self.jobs.put((weights.save, (file_name,)))
+
+    def save(self, name, state, arrays):
+        # `state` goes to state.pt, `arrays` to one .npy file per entry,
+        # both copied first as training keeps mutating the originals
+        state = copy.deepcopy(state)
+        arrays = {key: np.array(value) for key, value in arrays.items()}
+        self.jobs.put((self._write, (name, state, arrays)))
+
+    def _write(self, name, state, arrays):
+        final = os.path.join(self.folder, name)
+        tmp = final + '.tmp'
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp)
+        os.makedirs(os.path.join(tmp, 'replay'))
+        torch.save(state, os.path.join(tmp, 'state.pt'))
+        for key, value in arrays.items():
+            np.save(os.path.join(tmp, 'replay', key + '.npy'), value)
+        if os.path.exists(final):
+            shutil.rmtree(final)
+        os.rename(tmp, final)
+
+        latest = os.path.join(self.folder, 'latest')
+        with open(latest + '.tmp', 'w') as f:
+            f.write(name)
+        os.replace(latest + '.tmp', latest)
+        self._prune()
+
+    def _prune(self):
+        names = sorted(
+            name for name in os.listdir(self.folder)
+            if name.startswith('gen-') and not name.endswith('.tmp')
+        )
+        for name in names[:-self.keep]:
+            shutil.rmtree(os.path.join(self.folder, name))
+
+    def flush(self):
+        self.jobs.join()
+
+    def load(self):
+        # newest complete checkpoint, or None when there is nothing yet
+        latest = os.path.join(self.folder, 'latest')
+        if not os.path.exists(latest):
+            return None, None
+        with open(latest) as f:
+            path = os.path.join(self.folder, f.read().strip())
+        state = torch.load(os.path.join(path, 'state.pt'))
+        arrays = {
+            name[:-len('.npy')]: np.load(
+                os.path.join(path, 'replay', name),
+                mmap_mode='r'
+            )
+            for name in os.listdir(os.path.join(path, 'replay'))
+        }
+        return state, arrays
@@ -0,0 +1,267 @@
+import random
+from enum import Enum
+from collections import deque
+from collections import namedtuple
+
+# Pure simulation core of the snake game. Nothing in here touches pygame,
+# so it can be stepped headless as fast as the CPU allows and wrapped by
+# SnakeGameAI when a display is wanted.
+#
+# Everything runs on integer cell coordinates, (0, 0) being the top left
+# cell of a cols x rows board. Only the renderers convert cells to pixels.
+
+# Datastructure for points
+Point = namedtuple('Point', 'x, y')
+
+
+# Enums to limit Direction
+class Direction(Enum):
+    RIGHT = 1
+    LEFT = 2
+    UP = 3
+    DOWN = 4
+
+
+# Default board, 640 x 480 pixels at 20 pixels per cell
+COLS = 32
+ROWS = 24
+
+# clock wise order : right, down, left, up
+CLOCK_WISE = [Direction.RIGHT, Direction.DOWN, Direction.LEFT, Direction.UP]
+CLOCK_WISE_INDEX = {direction: i for i, direction in enumerate(CLOCK_WISE)}
+# cell offset of one move along every direction
+MOVES = {
+    Direction.RIGHT: (1, 0),
+    Direction.DOWN: (0, 1),
+    Direction.LEFT: (-1, 0),
+    Direction.UP: (0, -1)
+}
+
+
+class SnakeCore():
+    def __init__(self, cols=COLS, rows=ROWS, seed=None, timeout=True):
+        # the starting body lies 3 cells wide from the middle of the board
+        if cols < 4 or rows < 1:
+            raise ValueError(
+                'board of {} x {} cells is too small, the snake needs at '
+                'least 4 x 1'.format(cols, rows)
+            )
+        self.cols = cols
+        self.rows = rows
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.reset()
+
+    def reset(self, episode_seed=None):
+        # every episode places its food from its own seed, drawn from the
+        # game rng unless given, so (seed, actions) replays an episode
+        if episode_seed is None:
+            episode_seed = self.rng.getrandbits(64)
+        self.episode_seed = episode_seed
+        self.food_rng = random.Random(episode_seed)
+
+        # init game style
+        self.direction = Direction.RIGHT
+        head = Point(self.cols // 2, self.rows // 2)
+        self._set_body([head, Point(head.x - 1, head.y),
+                        Point(head.x - 2, head.y)])
+        self.score = 0
+        self.food = None
+        self._place_food()
+        self.frame_iteration = 0
+        # undo journal of snapshot / restore, None while nobody searches
+        self._journal = None
+
+    def load(self, snake, direction, food, score, frame_iteration,
+             episode_seed=None):
+        # put the game in an observed state, body given head first. Food
+        # eaten from here on is placed from `episode_seed`, drawn from the
+        # game rng unless given, not from the seed of the observed game
+        if episode_seed is None:
+            episode_seed = self.rng.getrandbits(64)
+        self.episode_seed = episode_seed
+        self.food_rng = random.Random(episode_seed)
+        self.direction = direction
+        self._set_body(snake)
+        self.score = score
+        self.food = food
+        self.frame_iteration = frame_iteration
+        self._journal = None
+
+    def _set_body(self, body):
+        # body is a ring buffer (head at index 0) mirrored by an occupancy
+        # grid counting the segments on every cell, both kept in step
+        # on head push and tail pop
+        self.snake = deque()
+        self.grid = bytearray(self.cols * self.rows)
+        # free cell index : swap remove array of empty cells plus the
+        # position of every cell inside it (-1 when occupied)
+        self._free = list(range(self.cols * self.rows))
+        self._free_pos = list(range(self.cols * self.rows))
+        for pt in reversed(body):
+            self._push(Point(*pt))
+        self.head = self.snake[0]
+
+    def _place_food(self):
+        # a board filled by the snake leaves the food where it was eaten
+        if not self._free:
+            return
+        cell = self._free[self.food_rng.randrange(len(self._free))]
+        self.food = Point(cell % self.cols, cell // self.cols)
+
+    def _occupy(self, cell):
+        pos = self._free_pos[cell]
+        last = self._free.pop()
+        if last != cell:
+            self._free[pos] = last
+            self._free_pos[last] = pos
+        self._free_pos[cell] = -1
+
+    def _vacate(self, cell):
+        self._free_pos[cell] = len(self._free)
+        self._free.append(cell)
+
+    def _cell(self, pt):
+        return pt.y * self.cols + pt.x
+
+    def _in_bounds(self, pt):
+        return 0 <= pt.x < self.cols and 0 <= pt.y < self.rows
+
+    def _push(self, pt):
+        self.snake.appendleft(pt)
+        # a head that left the board ends the game, nothing to mark
+        if self._in_bounds(pt):
+            cell = self._cell(pt)
+            if not self.grid[cell]:
+                self._occupy(cell)
+            self.grid[cell] += 1
+
+    def _pop(self):
+        pt = self.snake.pop()
+        cell = self._cell(pt)
+        self.grid[cell] -= 1
+        if not self.grid[cell]:
+            self._vacate(cell)
+
+    def _unoccupy(self, cell, pos):
+        # exact inverse of _occupy, `pos` being the position it removed
+        if pos == len(self._free):
+            self._free.append(cell)
+        else:
+            last = self._free[pos]
+            self._free_pos[last] = len(self._free)
+            self._free.append(last)
+            self._free[pos] = cell
+        self._free_pos[cell] = pos
+
+    def _unpop(self, pt):
+        cell = self._cell(pt)
+        if not self.grid[cell]:
+            # exact inverse of _vacate
+            self._free.pop()
+            self._free_pos[cell] = -1
+        self.grid[cell] += 1
+        self.snake.append(pt)
+
+    def snapshot(self):
+        # Mark to restore() back to. From the first snapshot on every step
+        # journals what it changes (old head, direction, food, score, the
+        # free index position of the new head cell and the popped tail or
+        # the food rng state), so snapshots and restores cost a few words
+        # per step taken, whatever the size of the board. Snapshots nest,
+        # reset() drops them all.
+        if self._journal is None:
+            self._journal = []
+        return len(self._journal)
+
+    def restore(self, mark):
+        journal = self._journal
+        while len(journal) > mark:
+            head, direction, food, score, head_pos, extra = journal.pop()
+            if extra is not None:
+                if score != self.score:
+                    self.food_rng.setstate(extra)
+                else:
+                    self._unpop(extra)
+            pt = self.snake.popleft()
+            if head_pos is not None:
+                cell = self._cell(pt)
+                self.grid[cell] -= 1
+                if not self.grid[cell]:
+                    self._unoccupy(cell, head_pos)
+            self.head = head
+            self.direction = direction
+            self.food = food
+            self.score = score
+            self.frame_iteration -= 1
+
+    def release(self):
+        # stop journaling, outstanding snapshots become invalid
+        self._journal = None
+
+    def step(self, action):
+        self.frame_iteration += 1
+        journal = self._journal
+        if journal is not None:
+            entry = [
+                self.head, self.direction, self.food, self.score, None, None
+            ]
+            journal.append(entry)
+
+        # 1. move
+        self._move_snake(action)  # update the head
+        if journal is not None and self._in_bounds(self.head):
+            entry[4] = self._free_pos[self._cell(self.head)]
+        self._push(self.head)
+
+        # 2. check if game over
+        reward = 0
+        game_over = False
+        timed_out = (
+            self.timeout and self.frame_iteration > 100*len(self.snake)
+        )
+        if self.is_collision() or timed_out:
+            game_over = True
+            reward = -10
+            return reward, game_over, self.score
+
+        # 3. place new food or just move
+        if self.head == self.food:
+            if journal is not None:
+                entry[5] = self.food_rng.getstate()
+            self.score += 1
+            reward = 10
+            self._place_food()
+        else:
+            if journal is not None:
+                entry[5] = self.snake[-1]
+            self._pop()
+
+        # 4. return game over and score
+        return reward, game_over, self.score
+
+    def is_collision(self, pt=None):
+        if pt is None:
+            pt = self.head
+        if not self._in_bounds(pt):
+            return True
+        # Snake collision starts at 1 index : the head occupies its own cell
+        # once, anything more is the body
+        if pt == self.head:
+            return self.grid[self._cell(pt)] > 1
+        return self.grid[self._cell(pt)] > 0
+
+    def _move_snake(self, action):
+        # [straight, right, left]
+        idx = CLOCK_WISE_INDEX[self.direction]
+        if action[0]:
+            pass  # no change
+        elif action[1]:
+            # r -> d -> l -> u
+            self.direction = CLOCK_WISE[(idx + 1) % 4]  # right turn
+        else:
+            # r -> u -> l -> d
+            self.direction = CLOCK_WISE[(idx - 1) % 4]  # left turn
+
+        dx, dy = MOVES[self.direction]
+        self.head = Point(self.head.x + dx, self.head.y + dy)
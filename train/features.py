@@ -0,0 +1,105 @@
+import numpy as np
+from train.core import CLOCK_WISE_INDEX
+
+# State features shared by training and inference. Both the single board
+# and the batched path read straight from the occupancy grid and the
+# direction of the environment and write into a caller provided buffer.
+#
+# [
+#   danger straight , danger right, danger left,
+#   direction left, direction right, direction up, direction down,
+#   food left, food right, food up, food down
+# ]
+STATE_SIZE = 11
+
+# cell offsets in the clock wise order of train.core : right, down, left, up
+STEPS = ((1, 0), (0, 1), (-1, 0), (0, -1))
+DX, DY = np.array(STEPS, dtype=np.int64).T
+# [direction left, direction right, direction up, direction down] bits
+DIRECTION_BITS = [
+    (False, True, False, False),
+    (False, False, False, True),
+    (True, False, False, False),
+    (False, False, True, False)
+]
+# straight, right turn, left turn
+TURNS = (0, 1, 3)
+# bit i of a packed state is feature i
+BIT_WEIGHTS = 1 << np.arange(STATE_SIZE)
+
+
+def get_state(game, out=None):
+    if out is None:
+        out = np.empty(STATE_SIZE, dtype=np.uint8)
+    grid = game.grid
+    cols = game.cols
+    rows = game.rows
+    d = CLOCK_WISE_INDEX[game.direction]
+    hx, hy = game.head
+
+    # danger straight, danger right, danger left
+    danger = []
+    for turn in TURNS:
+        dx, dy = STEPS[(d + turn) % 4]
+        x = hx + dx
+        y = hy + dy
+        danger.append(
+            not (0 <= x < cols and 0 <= y < rows) or grid[y * cols + x] > 0
+        )
+
+    fx, fy = game.food
+    out[:] = (
+        *danger,
+        *DIRECTION_BITS[d],
+        fx < hx,  # food left
+        fx > hx,  # food right
+        fy < hy,  # food up
+        fy > hy   # food down
+    )
+    return out
+
+
+def get_states(env, out=None):
+    # batched path over a VectorSnakeEnv, one (N, 11) uint8 array
+    if out is None:
+        out = np.empty((env.num_envs, STATE_SIZE), dtype=np.uint8)
+    envs = np.arange(env.num_envs)
+    d = env.direction
+    head = env.body[envs, env.head_ptr]
+    hx = head % env.cols
+    hy = head // env.cols
+
+    # danger straight, danger right, danger left
+    for col, turn in enumerate(TURNS):
+        nd = (d + turn) % 4
+        x = hx + DX[nd]
+        y = hy + DY[nd]
+        outside = (x < 0) | (x >= env.cols) | (y < 0) | (y >= env.rows)
+        cell = np.where(outside, 0, y * env.cols + x)
+        out[:, col] = outside | (env.grid[envs, cell] > 0)
+
+    # direction left, direction right, direction up, direction down
+    out[:, 3] = d == 2
+    out[:, 4] = d == 0
+    out[:, 5] = d == 3
+    out[:, 6] = d == 1
+
+    # food left, food right, food up, food down
+    has_food = env.food >= 0
+    fx = env.food % env.cols
+    fy = env.food // env.cols
+    out[:, 7] = has_food & (fx < hx)
+    out[:, 8] = has_food & (fx > hx)
+    out[:, 9] = has_food & (fy < hy)
+    out[:, 10] = has_food & (fy > hy)
+    return out
+
+
+def pack_states(states):
+    # one state or an (N, 11) batch -> 11 bit integers
+    return np.asarray(states) @ BIT_WEIGHTS
+
+
+def unpack_states(packed):
+    packed = np.asarray(packed)
+    return ((packed[..., None] >> np.arange(STATE_SIZE)) & 1).astype(np.uint8)
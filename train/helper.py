@@ -1,18 +1,25 @@
-import matplotlib.pyplot as plt
-from IPython import display
+# matplotlib and IPython are imported on the first plot only, training
+# without plots never pays for them
+plt = None
+display = None
 
-plt.ion()
 
-
-def plot(scores, mean_scores):
+def plot(scores, mean_scores, generations=None):
+    global plt, display
+    if plt is None:
+        import matplotlib.pyplot as plt
+        from IPython import display
+        plt.ion()
+    if generations is None:
+        generations = range(1, len(scores) + 1)
     display.clear_output(wait=True)
     display.display(plt.gcf())
     plt.clf()
     plt.title('Training...')
     plt.xlabel('Generation')
     plt.ylabel('Score')
-    plt.plot(scores)
-    plt.plot(mean_scores)
+    plt.plot(generations, scores)
+    plt.plot(generations, mean_scores)
     plt.ylim(ymin=0)
-    plt.text(len(scores)-1, scores[-1], str(scores[-1]))
-    plt.text(len(mean_scores)-1, mean_scores[-1], str(mean_scores[-1]))
+    plt.text(generations[-1], scores[-1], str(scores[-1]))
+    plt.text(generations[-1], mean_scores[-1], str(mean_scores[-1]))
@@ -0,0 +1,49 @@
+import numpy as np
+import torch
+
+# Action selection without autograd. Batches of states go through the
+# model in one call under torch.inference_mode, copied into a reusable
+# input tensor, and single states can skip torch entirely with a NumPy
+# forward pass of Linear_QNet (two matmuls and a ReLU). The NumPy weights
+# are views of the torch parameters, so optimizer steps and
+# load_state_dict are seen without copying anything.
+
+
+class InferenceEngine():
+    def __init__(self, model, max_batch=1, use_numpy=True):
+        self.model = model
+        self.use_numpy = use_numpy
+        self.inputs = torch.empty(
+            (max_batch, model.linear1.in_features),
+            dtype=torch.float
+        )
+        self.w1 = model.linear1.weight.detach().numpy()
+        self.b1 = model.linear1.bias.detach().numpy()
+        self.w2 = model.linear2.weight.detach().numpy()
+        self.b2 = model.linear2.bias.detach().numpy()
+
+    def q_values(self, states):
+        # (N, state size) -> (N, actions), one forward pass for the batch
+        states = torch.from_numpy(np.asarray(states))
+        if len(states) > len(self.inputs):
+            self.inputs = torch.empty(
+                (len(states), self.inputs.shape[1]),
+                dtype=torch.float
+            )
+        inputs = self.inputs[:len(states)]
+        with torch.inference_mode():
+            inputs.copy_(states)
+            return self.model(inputs).numpy()
+
+    def q_values_numpy(self, state):
+        state = np.asarray(state, dtype=np.float32)
+        hidden = np.maximum(self.w1 @ state + self.b1, 0)
+        return self.w2 @ hidden + self.b2
+
+    def act(self, state):
+        if self.use_numpy:
+            return int(np.argmax(self.q_values_numpy(state)))
+        return int(np.argmax(self.q_values(state[None])[0]))
+
+    def act_batch(self, states):
+        return np.argmax(self.q_values(states), axis=1)
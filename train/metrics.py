@@ -0,0 +1,145 @@
+import csv
+import json
+import multiprocessing as mp
+import os
+import queue
+import numpy as np
+
+# Training metrics. Every generation is appended to a CSV or JSONL log on
+# disk, while only the last `plot_window` generations are kept in memory
+# for plotting, so the cost per generation stays flat however long the run
+# gets. Plots are drawn every `plot_interval` generations, either inline or
+# in a separate process, and `plot_interval=0` is fully headless.
+
+FIELDS = ['generation', 'score', 'mean_score', 'record']
+
+
+def _plot_worker(plots):
+    from train.helper import plot
+    import matplotlib.pyplot as plt
+    while True:
+        window = plots.get()
+        if window is None:
+            break
+        plot(*window)
+        plt.pause(0.001)
+
+
+class MetricsLogger():
+    def __init__(self, path=None, plot_interval=1, plot_window=1000,
+                 plot_process=False):
+        self.plot_interval = plot_interval
+        self.plot_window = plot_window
+        self.total_score = 0
+        self.generation = 0
+
+        # ring buffer of the most recent generations
+        self.generations = np.zeros(plot_window, dtype=np.int64)
+        self.scores = np.zeros(plot_window, dtype=np.int64)
+        self.mean_scores = np.zeros(plot_window, dtype=np.float64)
+
+        self.file = None
+        self.writer = None
+        self.jsonl = False
+        if path is not None:
+            folder = os.path.dirname(path)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder)
+            self.jsonl = path.endswith('.jsonl')
+            new_file = not os.path.exists(path)
+            self.file = open(path, 'a', newline='', buffering=1)
+            if not self.jsonl:
+                self.writer = csv.writer(self.file)
+                if new_file:
+                    self.writer.writerow(FIELDS)
+
+        self.plots = None
+        self.plotter = None
+        if plot_interval and plot_process:
+            ctx = mp.get_context('spawn')
+            self.plots = ctx.Queue(maxsize=1)
+            self.plotter = ctx.Process(
+                target=_plot_worker,
+                args=(self.plots,),
+                daemon=True
+            )
+            self.plotter.start()
+
+    def log(self, score, record):
+        self.generation += 1
+        self.total_score += score
+        mean_score = self.total_score / self.generation
+
+        i = (self.generation - 1) % self.plot_window
+        self.generations[i] = self.generation
+        self.scores[i] = score
+        self.mean_scores[i] = mean_score
+
+        row = [self.generation, score, mean_score, record]
+        if self.jsonl:
+            self.file.write(json.dumps(dict(zip(FIELDS, row))) + '\n')
+        elif self.writer is not None:
+            self.writer.writerow(row)
+
+        if self.plot_interval and self.generation % self.plot_interval == 0:
+            self.plot()
+        return mean_score
+
+    def _log_size(self):
+        self.file.flush()
+        return os.fstat(self.file.fileno()).st_size
+
+    def state_dict(self):
+        # the plot window as plain lists, checkpoints load weights only
+        return dict(
+            generation=self.generation,
+            total_score=self.total_score,
+            generations=self.generations.tolist(),
+            scores=self.scores.tolist(),
+            mean_scores=self.mean_scores.tolist(),
+            log_size=None if self.file is None else self._log_size()
+        )
+
+    def load_state_dict(self, state):
+        self.generation = state['generation']
+        self.total_score = state['total_score']
+        if 'scores' in state and len(state['scores']) == self.plot_window:
+            self.generations[:] = state['generations']
+            self.scores[:] = state['scores']
+            self.mean_scores[:] = state['mean_scores']
+        # rows logged after the checkpoint are logged again from here
+        log_size = state.get('log_size')
+        if (self.file is not None and log_size is not None and
+                self._log_size() > log_size):
+            self.file.truncate(log_size)
+
+    def window(self):
+        # oldest first
+        n = min(self.generation, self.plot_window)
+        order = (self.generation - n + np.arange(n)) % self.plot_window
+        return (
+            self.scores[order],
+            self.mean_scores[order],
+            self.generations[order]
+        )
+
+    def plot(self):
+        if self.plots is not None:
+            try:
+                self.plots.put_nowait(self.window())
+            except queue.Full:
+                # the plotter is still busy, skip rather than stall
+                pass
+        else:
+            from train.helper import plot
+            plot(*self.window())
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+        if self.plotter is not None:
+            try:
+                self.plots.put_nowait(None)
+            except queue.Full:
+                self.plotter.terminate()
+            self.plotter.join(timeout=1)
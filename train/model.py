@@ -2,6 +2,8 @@ import torch
 import torch.nn as nn
 import torch.optim as optim
 import torch.nn.functional as F
+import numpy as np
+import copy
 import os
 
 
@@ -22,22 +24,44 @@ class Linear_QNet(nn.Module):
             os.makedirs(model_folder_path)
 
         file_name = os.path.join(model_folder_path, file_name)
-        torch.save(self.state_dict(), file_name)
+        # write aside and rename, a crash never leaves a torn file behind
+        torch.save(self.state_dict(), file_name + '.tmp')
+        os.replace(file_name + '.tmp', file_name)
 
 
 class QTrainer:
-    def __init__(self, model, lr, gamma):
+    def __init__(self, model, lr, gamma, target_update=None, tau=None,
+                 double=False):
         self.lr = lr
         self.gamma = gamma
         self.model = model
         self.optimizer = optim.Adam(model.parameters(), lr=self.lr)
         self.criterion = nn.MSELoss()
 
-    def train_step(self, state, action, reward, next_state, done):
-        state = torch.tensor(state, dtype=torch.float)
-        action = torch.tensor(action, dtype=torch.long)
-        reward = torch.tensor(reward, dtype=torch.float)
-        next_state = torch.tensor(next_state, dtype=torch.float)
+        # frozen target network : hard copied every `target_update` train
+        # steps, or Polyak averaged with rate `tau` after every step.
+        # Without either the model bootstraps from itself.
+        self.target_update = target_update
+        self.tau = tau
+        self.double = double
+        self.steps = 0
+        self.target_model = None
+        if target_update is not None or tau is not None:
+            self.target_model = copy.deepcopy(model)
+            self.target_model.requires_grad_(False)
+        elif double:
+            raise ValueError('double DQN needs target_update or tau')
+
+    def train_step(self, state, action, reward, next_state, done,
+                   weights=None):
+        state = torch.as_tensor(np.asarray(state), dtype=torch.float)
+        action = torch.as_tensor(np.asarray(action), dtype=torch.long)
+        reward = torch.as_tensor(np.asarray(reward), dtype=torch.float)
+        next_state = torch.as_tensor(
+            np.asarray(next_state),
+            dtype=torch.float
+        )
+        done = torch.as_tensor(np.asarray(done), dtype=torch.bool)
 
         if len(state.shape) == 1:
             # To handle (1, x) size
@@ -45,27 +69,73 @@ class QTrainer:
             action = torch.unsqueeze(action, 0)
             reward = torch.unsqueeze(reward, 0)
             next_state = torch.unsqueeze(next_state, 0)
-            done = (done, )
+            done = torch.unsqueeze(done, 0)
 
         # 1. predicted Q values with current state
         pred = self.model(state)
 
         # 2. Q_new = reward + gamma * max(next_predicted Q value)
-        # only do above step if not "done"
-        # pred.clone() (deep copy)
-        # preds[argmax(action)] = Q_new
-
-        target = pred.clone()
-        for idx in range(len(done)):
-            Q_new = reward[idx]
-            if not done[idx]:
-                Q_new = reward[idx] + self.gamma * torch.max(
-                                    self.model(next_state[idx])
-                                )
-            target[idx][torch.argmax(action).item()] = Q_new
+        # only do above step if not "done", one batched forward pass
+        # for the whole batch, kept out of the graph
+        with torch.no_grad():
+            bootstrap = self.model
+            if self.target_model is not None:
+                bootstrap = self.target_model
+            if self.double:
+                # online model picks the action, target model rates it
+                best = self.model(next_state).argmax(dim=1, keepdim=True)
+                next_q = bootstrap(next_state).gather(1, best).squeeze(1)
+            else:
+                next_q = bootstrap(next_state).max(dim=1).values
+            q_new = reward + self.gamma * next_q * ~done
+
+        # 3. target is pred with every row's taken action replaced by Q_new
+        # preds[row, argmax(action[row])] = Q_new[row]
+        target = pred.detach().clone()
+        rows = torch.arange(len(target))
+        target[rows, torch.argmax(action, dim=1)] = q_new
 
         self.optimizer.zero_grad()
-        loss = self.criterion(target, pred)
+        if weights is None:
+            loss = self.criterion(target, pred)
+        else:
+            # importance sampling weights scale every sample's error
+            weights = torch.as_tensor(weights, dtype=torch.float)
+            loss = (weights.unsqueeze(1) * (target - pred) ** 2).mean()
         loss.backward()
 
         self.optimizer.step()
+        self.update_target()
+
+        # TD errors, only the taken action differs between target and pred
+        return (target - pred).detach().abs().sum(dim=1).numpy()
+
+    def update_target(self):
+        self.steps += 1
+        if self.target_model is None:
+            return
+        if self.tau is not None:
+            with torch.no_grad():
+                for target, online in zip(
+                    self.target_model.parameters(),
+                    self.model.parameters()
+                ):
+                    target.lerp_(online, self.tau)
+        elif self.steps % self.target_update == 0:
+            self.target_model.load_state_dict(self.model.state_dict())
+
+    def state_dict(self):
+        state = dict(
+            optimizer=self.optimizer.state_dict(),
+            steps=self.steps,
+            target_model=None
+        )
+        if self.target_model is not None:
+            state['target_model'] = self.target_model.state_dict()
+        return state
+
+    def load_state_dict(self, state):
+        self.optimizer.load_state_dict(state['optimizer'])
+        self.steps = state['steps']
+        if self.target_model is not None and state['target_model']:
+            self.target_model.load_state_dict(state['target_model'])
@@ -0,0 +1,60 @@
+import numpy as np
+import torch
+from train.features import STATE_SIZE
+from train.features import pack_states
+from train.features import unpack_states
+
+# Bit packed transitions. A whole (state, action, reward, next_state, done)
+# transition fits in one uint32:
+#
+#   bits  0-10   state features
+#   bits 11-21   next state features
+#   bits 22-23   action index, 0 straight, 1 right, 2 left
+#   bits 24-25   reward class, 0 for -10, 1 for 0, 2 for +10
+#   bit  26      done
+#
+# Packing and unpacking are vectorized over batches, so replay memory and
+# on-disk logs hold 4 bytes per transition and get expanded to float
+# tensors only for the sampled batch.
+
+NEXT_SHIFT = STATE_SIZE
+ACTION_SHIFT = 2 * STATE_SIZE
+REWARD_SHIFT = ACTION_SHIFT + 2
+DONE_SHIFT = REWARD_SHIFT + 2
+STATE_MASK = (1 << STATE_SIZE) - 1
+# reward of every reward class, the game only ever hands out these three
+REWARDS = np.array([-10.0, 0.0, 10.0], dtype=np.float32)
+
+
+def pack_transitions(states, actions, rewards, next_states, dones):
+    # one transition or a batch of them, actions are indices
+    packed = pack_states(states).astype(np.uint32)
+    packed |= pack_states(next_states).astype(np.uint32) << NEXT_SHIFT
+    packed |= np.asarray(actions, dtype=np.uint32) << ACTION_SHIFT
+    reward_class = (np.sign(rewards) + 1).astype(np.uint32)
+    packed |= reward_class << REWARD_SHIFT
+    packed |= np.asarray(dones, dtype=np.uint32) << DONE_SHIFT
+    return packed
+
+
+def unpack_transitions(packed):
+    packed = np.asarray(packed, dtype=np.uint32)
+    return (
+        unpack_states(packed & STATE_MASK),
+        ((packed >> ACTION_SHIFT) & 3).astype(np.int64),
+        REWARDS[(packed >> REWARD_SHIFT) & 3],
+        unpack_states((packed >> NEXT_SHIFT) & STATE_MASK),
+        ((packed >> DONE_SHIFT) & 1).astype(np.bool_)
+    )
+
+
+def unpack_to_tensors(packed):
+    # sampled batch straight to the float tensors QTrainer works on
+    states, actions, rewards, next_states, dones = unpack_transitions(packed)
+    return (
+        torch.from_numpy(states).float(),
+        torch.from_numpy(actions),
+        torch.from_numpy(rewards),
+        torch.from_numpy(next_states).float(),
+        torch.from_numpy(dones)
+    )
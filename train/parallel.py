@@ -0,0 +1,159 @@
+import multiprocessing as mp
+import queue
+import random
+import numpy as np
+import torch
+from train.agent import Agent
+from train.agent import ACTION_SIZE
+from train.agent import METRICS_PATH
+from train.core import COLS
+from train.core import ROWS
+from train.environment import SnakeGameAI
+from train.metrics import MetricsLogger
+from train.packing import pack_transitions
+from train.packing import unpack_transitions
+from train.replay_store import ReplayStore
+
+# Actor / learner training. Every actor process plays its own headless
+# SnakeGameAI with a local copy of the network and streams transitions to
+# the learner, which owns the only Linear_QNet / QTrainer that is trained
+# and broadcasts its weights back every `sync_interval` generations.
+
+# Transitions an actor buffers before shipping them to the learner
+CHUNK_SIZE = 200
+
+
+def _latest(weights):
+    # drain the broadcast queue, only the newest weights matter
+    latest = None
+    try:
+        while True:
+            latest = weights.get_nowait()
+    except queue.Empty:
+        pass
+    return latest
+
+
+def _ship(chunk, score, worker_id, transitions, store):
+    # chunks travel bit packed, 4 bytes per transition
+    states, actions, rewards, next_states, dones = map(np.array, zip(*chunk))
+    packed = pack_transitions(
+        states, np.argmax(actions, axis=1), rewards, next_states, dones
+    )
+    if store is not None:
+        store.append_packed(packed)
+    transitions.put((worker_id, packed, score))
+
+
+def _actor(worker_id, seed, transitions, weights, replay_store, cols, rows):
+    torch.set_num_threads(1)
+    random.seed(seed)
+    agent = Agent()
+    game = SnakeGameAI(cols, rows, headless=True, seed=seed)
+    # every actor appends straight to the shared on-disk store
+    store = None
+    if replay_store is not None:
+        store = ReplayStore(replay_store)
+    chunk = []
+    while True:
+        latest = _latest(weights)
+        if latest is not None:
+            agent.generation, state_dict = latest
+            agent.model.load_state_dict(state_dict)
+
+        state_old = agent.get_state(game)
+        final_move = agent.get_action(state_old)
+        reward, done, score = game.play_step(final_move)
+        state_new = agent.get_state(game)
+        chunk.append((state_old, final_move, reward, state_new, done))
+
+        if done:
+            game.reset()
+            _ship(chunk, score, worker_id, transitions, store)
+            chunk = []
+        elif len(chunk) >= CHUNK_SIZE:
+            _ship(chunk, None, worker_id, transitions, store)
+            chunk = []
+
+
+def _broadcast(agent, weights):
+    state_dict = {
+        k: v.detach().clone() for k, v in agent.model.state_dict().items()
+    }
+    for q in weights:
+        # drop a broadcast the actor has not picked up yet
+        _latest(q)
+        q.put((agent.generation, state_dict))
+
+
+def train_parallel(num_workers=None, sync_interval=10, seed=0,
+                   metrics_path=METRICS_PATH, plot_interval=0,
+                   plot_process=False, replay_store=None, cols=COLS,
+                   rows=ROWS, **agent_options):
+    if num_workers is None:
+        num_workers = max(1, mp.cpu_count() - 1)
+    ctx = mp.get_context('spawn')
+    transitions = ctx.Queue(maxsize=4 * num_workers)
+    weights = [ctx.Queue() for _ in range(num_workers)]
+    workers = [
+        ctx.Process(
+            target=_actor,
+            args=(
+                i, seed + i, transitions, weights[i], replay_store, cols, rows
+            ),
+            daemon=True
+        )
+        for i in range(num_workers)
+    ]
+    for worker in workers:
+        worker.start()
+
+    metrics = MetricsLogger(
+        metrics_path,
+        plot_interval or 0,
+        plot_process=plot_process
+    )
+    record = 0
+    agent = Agent(**agent_options)
+    _broadcast(agent, weights)
+    try:
+        while True:
+            worker_id, packed, score = transitions.get()
+
+            # train short memory on the whole chunk, then remember it
+            states, actions, rewards, next_states, dones = (
+                unpack_transitions(packed)
+            )
+            agent.train_short_memory(
+                states,
+                np.eye(ACTION_SIZE, dtype=np.int64)[actions],
+                rewards,
+                next_states,
+                dones
+            )
+            agent.memory.push_packed(packed)
+
+            if score is None:
+                continue
+
+            # an actor finished a game : train long memory, plot result
+            agent.generation += 1
+            agent.train_long_memory()
+
+            if score > record:
+                record = score
+                agent.model.save()
+
+            if agent.generation % sync_interval == 0:
+                _broadcast(agent, weights)
+
+            print('Generation : ', agent.generation, end=" | ")
+            print('Worker : ', worker_id, end=" | ")
+            print('Score : ', score, end=" | ")
+            print('Record : ', record)
+
+            metrics.log(score, record)
+    finally:
+        metrics.close()
+        for worker in workers:
+            worker.terminate()
@@ -0,0 +1,348 @@
+import argparse
+import math
+import multiprocessing as mp
+import random
+import time
+import numpy as np
+import torch
+from train.core import COLS
+from train.core import ROWS
+from train.core import SnakeCore
+from train.features import BIT_WEIGHTS
+from train.features import STATE_SIZE
+from train.features import get_state
+from train.inference import InferenceEngine
+from train.model import Linear_QNet
+from train.policy_table import all_states
+from train.recording import ACTIONS
+
+# Monte Carlo tree search over headless simulations, guided by a trained
+# Linear_QNet. The planner mirrors what a player sees of the real game
+# (body, direction, food, score and frame) in a SnakeCore of its own and
+# searches from there with snapshot() / restore(), so a simulation costs
+# only the steps it takes. The mirror places food from a seed of the
+# planner, never from the episode seed, so search cannot peek at the food
+# the real game is going to place.
+#
+# The network is evaluated once on all 2048 states up front, a leaf then
+# costs a state lookup. Its Q values are both the prior over the actions of
+# a node (softmax) and the value of the state at a leaf (max), and serve as
+# the estimate of a move not tried yet. Search stops at eating : where the
+# next food appears is unknown to a player, the leaf value only sees a
+# guess of the planner's rng.
+#
+# Every move runs until the node or time budget is spent, the most visited
+# move is played and its subtree is kept for the next move. With a pool the
+# root moves are split across worker processes, each searching its own
+# share with the full budget, e.g.
+#
+#   $ python -m train.planner experiments/best61.pth --games 20 --nodes 200
+
+# Constants
+ACTION_SIZE = 3
+HIDDEN_SIZE = 256
+NODES = 200
+C_PUCT = 5.0
+GAMMA = 0.9
+
+
+class Node():
+    def __init__(self, reward=0, done=False, ate=False):
+        self.reward = reward  # of the move leading here
+        self.done = done
+        # a node that ate is not searched beyond
+        self.ate = ate
+        self.visits = 0
+        self.value_sum = 0.0
+        self.value = 0.0  # leaf estimate
+        self.q = None  # network Q values, set once evaluated
+        self.priors = None
+        self.children = [None] * ACTION_SIZE
+
+    def mean(self):
+        return self.value_sum / self.visits
+
+
+class Planner():
+    def __init__(self, model, cols=COLS, rows=ROWS, timeout=True,
+                 nodes=NODES, seconds=None, c_puct=C_PUCT, gamma=GAMMA,
+                 seed=None):
+        self.nodes = nodes
+        self.seconds = seconds
+        self.c_puct = c_puct
+        self.gamma = gamma
+        engine = InferenceEngine(model, max_batch=1 << STATE_SIZE)
+        self.q_table = engine.q_values(all_states())
+        self.sim = SnakeCore(cols, rows, timeout=timeout)
+        self.state = np.empty(STATE_SIZE, dtype=np.uint8)
+        # seeds of the food placed in the mirror
+        self.rng = random.Random(seed)
+        self.root = None
+
+    def _evaluate(self, node):
+        if node.done:
+            return
+        index = int(get_state(self.sim, self.state) @ BIT_WEIGHTS)
+        node.q = self.q_table[index]
+        priors = np.exp(node.q - node.q.max())
+        node.priors = priors / priors.sum()
+        node.value = float(node.q.max())
+
+    def _select(self, node, allowed):
+        sqrt_visits = math.sqrt(node.visits)
+        best = None
+        for a in allowed:
+            child = node.children[a]
+            if child is None or not child.visits:
+                q = node.q[a]
+                visits = 0
+            else:
+                q = child.reward + self.gamma * child.mean()
+                visits = child.visits
+            score = q + (
+                self.c_puct * node.priors[a] * sqrt_visits / (1 + visits)
+            )
+            if best is None or score > best_score:
+                best = a
+                best_score = score
+        return best
+
+    def _simulate(self, root, allowed):
+        sim = self.sim
+        mark = sim.snapshot()
+        node = root
+        path = [root]
+        while True:
+            a = self._select(node, allowed if node is root else range(3))
+            child = node.children[a]
+            reward, done, _ = sim.step(ACTIONS[a])
+            if child is None:
+                child = Node(reward, done, reward > 0)
+                self._evaluate(child)
+                node.children[a] = child
+            path.append(child)
+            node = child
+            if child.done or child.ate or not child.visits:
+                break
+        sim.restore(mark)
+
+        value = node.value
+        for node in reversed(path):
+            node.visits += 1
+            node.value_sum += value
+            value = node.reward + self.gamma * value
+
+    def search(self, allowed=range(ACTION_SIZE)):
+        # (visits, Q) of every root move after spending the budget, moves
+        # outside `allowed` are left unvisited
+        if self.root is None:
+            self.root = Node()
+            self._evaluate(self.root)
+            self.root.visits = 1
+        root = self.root
+        start = time.perf_counter()
+        for i in range(self.nodes):
+            if (self.seconds is not None and
+                    time.perf_counter() - start > self.seconds):
+                break
+            self._simulate(root, allowed)
+        visits = np.zeros(ACTION_SIZE, dtype=np.int64)
+        q = np.full(ACTION_SIZE, -np.inf)
+        for a in allowed:
+            child = root.children[a]
+            if child is not None and child.visits:
+                visits[a] = child.visits
+                q[a] = child.reward + self.gamma * child.mean()
+        return visits, q
+
+    def sync(self, observation):
+        # mirror the real game, the subtree is kept while the game is where
+        # the mirror went
+        (cols, rows, snake, direction, food, score, frame_iteration,
+         timeout) = observation
+        if self.sim.cols != cols or self.sim.rows != rows:
+            # a board of another size, the mirror follows it
+            self.sim = SnakeCore(cols, rows, timeout=timeout)
+            self.root = None
+        sim = self.sim
+        sim.timeout = timeout
+        if (self.root is not None and
+                sim.frame_iteration == frame_iteration and
+                sim.score == score and sim.food == food and
+                sim.direction == direction and list(sim.snake) == snake):
+            return
+        self.root = None
+        sim.load(snake, direction, food, score, frame_iteration,
+                 self.rng.getrandbits(64))
+
+    def advance(self, code):
+        # play a real move, keeping the subtree under it
+        if self.root is not None:
+            self.root = self.root.children[code]
+        if self.root is not None and self.root.ate:
+            # searched as a leaf only, start again from here
+            self.root = None
+        self.sim.release()
+        self.sim.step(ACTIONS[code])
+
+    def act(self, game):
+        self.sync(observe(game))
+        visits, q = self.search()
+        code = choose(visits, q)
+        self.advance(code)
+        final_move = [0, 0, 0]
+        final_move[code] = 1
+        return final_move
+
+
+def observe(game):
+    # what a player sees of a game, enough to search from it
+    return (
+        game.cols,
+        game.rows,
+        list(game.snake),
+        game.direction,
+        game.food,
+        game.score,
+        game.frame_iteration,
+        game.timeout
+    )
+
+
+def choose(visits, q):
+    # most visited move, Q breaks ties
+    return int(np.lexsort((q, visits))[-1])
+
+
+def _worker(conn, state_dict, options, allowed):
+    torch.set_num_threads(1)
+    model = Linear_QNet(STATE_SIZE, HIDDEN_SIZE, ACTION_SIZE)
+    model.load_state_dict(state_dict)
+    planner = Planner(model, **options)
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        # the move played last, so the subtree under it is kept
+        code, observation = message
+        if code is not None:
+            planner.advance(code)
+        planner.sync(observation)
+        conn.send(planner.search(allowed))
+
+
+class PlannerPool():
+    # Root parallel search : worker i owns the root moves a with
+    # a % workers == i and searches them with the full budget, the move
+    # with the best Q over all workers is played, as visit counts of
+    # separate searches do not compare. A single worker owns every root
+    # move and plays like Planner. More than ACTION_SIZE workers would have
+    # nothing to do.
+    def __init__(self, model, workers=ACTION_SIZE, **options):
+        workers = max(1, min(workers, ACTION_SIZE))
+        ctx = mp.get_context('spawn')
+        state_dict = {
+            k: v.detach().clone() for k, v in model.state_dict().items()
+        }
+        self.conns = []
+        self.workers = []
+        for i in range(workers):
+            parent, child = ctx.Pipe()
+            worker = ctx.Process(
+                target=_worker,
+                args=(
+                    child,
+                    state_dict,
+                    options,
+                    list(range(i, ACTION_SIZE, workers))
+                ),
+                daemon=True
+            )
+            worker.start()
+            self.conns.append(parent)
+            self.workers.append(worker)
+        self.code = None
+
+    def act(self, game):
+        observation = observe(game)
+        for conn in self.conns:
+            conn.send((self.code, observation))
+        visits = np.zeros(ACTION_SIZE, dtype=np.int64)
+        q = np.full(ACTION_SIZE, -np.inf)
+        for conn in self.conns:
+            v, values = conn.recv()
+            visits += v
+            q = np.maximum(q, values)
+        if len(self.conns) == 1:
+            code = choose(visits, q)
+        else:
+            code = int(np.argmax(q))
+        self.code = code
+        final_move = [0, 0, 0]
+        final_move[code] = 1
+        return final_move
+
+    def close(self):
+        for conn in self.conns:
+            conn.send(None)
+        for worker in self.workers:
+            worker.join()
+
+
+def play(planner, games, seed=0, cols=COLS, rows=ROWS):
+    # headless games played by the planner, final scores and moves played
+    from train.environment import SnakeGameAI
+
+    game = SnakeGameAI(cols, rows, headless=True, seed=seed)
+    scores = []
+    moves = 0
+    while len(scores) < games:
+        _, done, score = game.play_step(planner.act(game))
+        moves += 1
+        if done:
+            scores.append(score)
+            game.reset()
+    return scores, moves
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('checkpoint', help='path of the .pth to plan with')
+    parser.add_argument('--games', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--nodes',
+        type=int,
+        default=NODES,
+        help='simulations per move'
+    )
+    parser.add_argument(
+        '--seconds',
+        type=float,
+        default=None,
+        help='time budget per move, on top of --nodes'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=0,
+        help='processes splitting the root moves, 0 searches in process'
+    )
+    args = parser.parse_args()
+
+    model = Linear_QNet(STATE_SIZE, HIDDEN_SIZE, ACTION_SIZE)
+    model.load_state_dict(torch.load(args.checkpoint))
+    options = dict(nodes=args.nodes, seconds=args.seconds)
+    if args.workers > 0:
+        planner = PlannerPool(model, args.workers, **options)
+    else:
+        planner = Planner(model, **options)
+    start = time.perf_counter()
+    scores, moves = play(planner, args.games, args.seed)
+    elapsed = time.perf_counter() - start
+    if args.workers > 0:
+        planner.close()
+    print('Games : ', len(scores), end=" | ")
+    print('Mean score : ', float(np.mean(scores)), end=" | ")
+    print('Max score : ', max(scores), end=" | ")
+    print('Move latency : ', '{:.2f}ms'.format(elapsed / moves * 1e3))
@@ -0,0 +1,65 @@
+import argparse
+import os
+import numpy as np
+import torch
+from train.features import STATE_SIZE
+from train.features import pack_states
+from train.features import unpack_states
+from train.inference import InferenceEngine
+from train.model import Linear_QNet
+
+# Lookup table policy. The state is 11 bits, so a trained Linear_QNet can
+# be evaluated once on all 2048 possible states and replaced at serving
+# time by a 2048 entry action table, one array index per frame. The table
+# is saved next to the checkpoint it was compiled from, e.g.
+#
+#   $ python -m train.policy_table experiments/best61.pth
+#   -> experiments/best61.table.npy
+
+# Constants
+ACTION_SIZE = 3
+HIDDEN_SIZE = 256
+
+
+def all_states():
+    return unpack_states(np.arange(1 << STATE_SIZE))
+
+
+def state_index(state):
+    # works for one state or an (N, 11) batch
+    return pack_states(state)
+
+
+def table_path(checkpoint):
+    return os.path.splitext(checkpoint)[0] + '.table.npy'
+
+
+def compile_table(model):
+    engine = InferenceEngine(model, max_batch=1 << STATE_SIZE)
+    return engine.act_batch(all_states()).astype(np.uint8)
+
+
+def verify_table(table, model):
+    # number of states where the table and a plain forward pass disagree
+    with torch.no_grad():
+        states = torch.tensor(all_states(), dtype=torch.float)
+        actions = torch.argmax(model(states), dim=1).numpy()
+    return int((actions != table).sum())
+
+
+def load_table(checkpoint):
+    return np.load(table_path(checkpoint))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('checkpoint', help='path of the .pth to compile')
+    args = parser.parse_args()
+
+    model = Linear_QNet(STATE_SIZE, HIDDEN_SIZE, ACTION_SIZE)
+    model.load_state_dict(torch.load(args.checkpoint))
+    table = compile_table(model)
+    mismatches = verify_table(table, model)
+    np.save(table_path(args.checkpoint), table)
+    print('Table : ', table_path(args.checkpoint), end=" | ")
+    print('Mismatches : ', mismatches)
@@ -0,0 +1,84 @@
+import cProfile
+import os
+import signal
+import time
+
+# Instrumentation for the training loop. PhaseTimer splits wall clock time
+# between named phases with a single perf_counter call per phase boundary,
+# and ProfileCapture runs cProfile over a window of generations, either
+# from the start of training or when the process receives SIGUSR1
+# (`kill -USR1 <pid>`), so a stalled production run can be inspected
+# without restarting it. Sampling profilers such as py-spy can attach to
+# the same pid at any time.
+
+
+class PhaseTimer():
+    def __init__(self):
+        self.totals = {}
+        self.counts = {}
+        self.last = time.perf_counter()
+
+    def lap(self, phase):
+        # charge the time since the previous lap to `phase`
+        now = time.perf_counter()
+        self.totals[phase] = self.totals.get(phase, 0.0) + now - self.last
+        self.last = now
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def summary(self):
+        # per phase time since the previous summary, then start over
+        total = sum(self.totals.values()) or 1.0
+        parts = [
+            '{} {:.1f}ms {:.0f}%'.format(phase, t * 1e3, 100 * t / total)
+            for phase, t in self.totals.items()
+        ]
+        parts += [
+            '{} {}'.format(name, n) for name, n in self.counts.items()
+        ]
+        if 'steps' in self.counts:
+            parts.append('{:.0f} steps/s'.format(self.counts['steps'] / total))
+        self.totals = {}
+        self.counts = {}
+        return ' | '.join(parts)
+
+
+class ProfileCapture():
+    def __init__(self, generations=0, window=10, folder='./experiments'):
+        self.folder = folder
+        self.window = window
+        self.profiler = None
+        self.start_generation = 0
+        # capture the first `generations` generations when asked to
+        self.remaining = generations
+        self.requested = generations > 0
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, self.request)
+
+    def request(self, signum=None, frame=None):
+        if self.profiler is None:
+            self.requested = True
+            self.remaining = self.window
+
+    def tick(self, generation):
+        # called once at the end of every generation
+        if self.profiler is None:
+            if self.requested:
+                self.requested = False
+                self.start_generation = generation
+                self.profiler = cProfile.Profile()
+                self.profiler.enable()
+            return
+        self.remaining -= 1
+        if self.remaining <= 0:
+            self.profiler.disable()
+            if not os.path.exists(self.folder):
+                os.makedirs(self.folder)
+            path = os.path.join(
+                self.folder,
+                'profile-{}-{}.prof'.format(self.start_generation, generation)
+            )
+            self.profiler.dump_stats(path)
+            self.profiler = None
+            print('Profile : ', path)
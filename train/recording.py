@@ -0,0 +1,184 @@
+import argparse
+import os
+import struct
+import time
+import numpy as np
+from train.core import SnakeCore
+from train.storage import create_log
+
+# Episode recordings. An episode is fully determined by the board, the
+# timeout flag and its food seed (see SnakeCore.reset), so only those and
+# the actions are kept, every action as a 2 bit code packed four to a
+# byte. Episodes are appended to a single log behind a small header:
+#
+#   file header   b'SNAKEEP1'
+#   episode       cols u16, rows u16, timeout u8, seed u64, steps u32,
+#                 score u32, then ceil(steps / 4) bytes of actions
+#
+# A 1000 step game takes about 270 bytes. The replayer re-simulates
+# headless at full speed and can render any frame range, e.g.
+#
+#   $ python -m train.recording experiments/episodes.bin --list
+#   $ python -m train.recording experiments/episodes.bin --episode 12 \
+#         --start 400 --end 600
+
+MAGIC = b'SNAKEEP1'
+EPISODE = struct.Struct('<HHBQII')
+ACTIONS = ([1, 0, 0], [0, 1, 0], [0, 0, 1])
+
+
+def action_code(action):
+    # one hot [straight, right, left] -> 0, 1 or 2
+    if action[0]:
+        return 0
+    return 1 if action[1] else 2
+
+
+def pack_actions(codes):
+    codes = np.frombuffer(bytes(codes), dtype=np.uint8)
+    padded = np.zeros(-(-len(codes) // 4) * 4, dtype=np.uint8)
+    padded[:len(codes)] = codes
+    padded = padded.reshape(-1, 4)
+    return (
+        padded[:, 0] | padded[:, 1] << 2 | padded[:, 2] << 4 |
+        padded[:, 3] << 6
+    ).tobytes()
+
+
+def unpack_actions(packed, steps):
+    packed = np.frombuffer(packed, dtype=np.uint8)
+    codes = (packed[:, None] >> np.array([0, 2, 4, 6], dtype=np.uint8)) & 3
+    return codes.reshape(-1)[:steps]
+
+
+class EpisodeRecorder():
+    # Collects the action codes of the running episode, SnakeGameAI feeds
+    # it one code per step and the whole episode is packed and appended to
+    # the log in one write when it ends.
+    def __init__(self, path):
+        self.path = path
+        create_log(path, MAGIC)
+        self.fd = None
+        self.codes = bytearray()
+
+    def start(self):
+        self.codes.clear()
+
+    def write(self, game):
+        record = EPISODE.pack(
+            game.cols,
+            game.rows,
+            game.timeout,
+            game.episode_seed,
+            len(self.codes),
+            game.score
+        ) + pack_actions(self.codes)
+        if self.fd is None:
+            self.fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+        os.write(self.fd, record)
+        self.codes.clear()
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def read_episodes(path):
+    # list of dicts, actions unpacked to an array of codes
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError('{} is not an episode log'.format(path))
+    episodes = []
+    offset = len(MAGIC)
+    while offset + EPISODE.size <= len(data):
+        cols, rows, timeout, seed, steps, score = EPISODE.unpack_from(
+            data, offset
+        )
+        offset += EPISODE.size
+        size = -(-steps // 4)
+        if offset + size > len(data):
+            break  # partly written last episode
+        episodes.append(dict(
+            cols=cols,
+            rows=rows,
+            timeout=bool(timeout),
+            seed=seed,
+            steps=steps,
+            score=score,
+            actions=unpack_actions(data[offset:offset + size], steps)
+        ))
+        offset += size
+    return episodes
+
+
+def replay(episode, game=None, end=None):
+    # re-simulate headless up to frame `end` (the whole episode by
+    # default) and return the game, which can be rendered from there
+    if game is None:
+        game = SnakeCore(episode['cols'], episode['rows'],
+                         timeout=episode['timeout'])
+    game.reset(episode_seed=episode['seed'])
+    for code in episode['actions'][:end]:
+        game.step(ACTIONS[code])
+    return game
+
+
+def verify(episode):
+    # replaying must end the game on the last step with the logged score
+    game = replay(episode, end=episode['steps'] - 1)
+    _, game_over, score = game.step(ACTIONS[episode['actions'][-1]])
+    return game_over and score == episode['score']
+
+
+def show(episode, start=0, end=None):
+    # fast forward headless to `start`, then play frames up to `end`
+    from train.environment import SnakeGameAI
+
+    game = SnakeGameAI(episode['cols'], episode['rows'], train=False)
+    game.timeout = episode['timeout']
+    replay(episode, game, start)
+    for code in episode['actions'][start:end]:
+        _, game_over, _ = game.play_step(ACTIONS[code])
+        if game_over:
+            break
+    return game
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', help='episode log file')
+    parser.add_argument(
+        '--list',
+        action='store_true',
+        help='print every episode of the log'
+    )
+    parser.add_argument(
+        '--episode',
+        type=int,
+        default=None,
+        help='render this episode'
+    )
+    parser.add_argument('--start', type=int, default=0)
+    parser.add_argument('--end', type=int, default=None)
+    args = parser.parse_args()
+    episodes = read_episodes(args.path)
+
+    if args.list:
+        for i, episode in enumerate(episodes):
+            print('Episode : ', i, end=" | ")
+            print('Steps : ', episode['steps'], end=" | ")
+            print('Score : ', episode['score'])
+    elif args.episode is not None:
+        show(episodes[args.episode], args.start, args.end)
+    else:
+        # re-simulate everything headless and check every final score
+        start = time.perf_counter()
+        failed = [i for i, episode in enumerate(episodes)
+                  if not verify(episode)]
+        elapsed = time.perf_counter() - start
+        steps = sum(episode['steps'] for episode in episodes)
+        print('Episodes : ', len(episodes), end=" | ")
+        print('Mismatches : ', failed, end=" | ")
+        print('Speed : ', '{:.0f} steps/s'.format(steps / elapsed))
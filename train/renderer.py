@@ -0,0 +1,124 @@
+import pygame
+from train.core import Point
+
+# Incremental pygame renderer shared by game.py and SnakeGameAI. A move
+# only changes a few cells (the new head, the freed tail and the food), so
+# after one full redraw only those cells are painted and handed to
+# pygame.display.update, and a frame costs the same whatever the length of
+# the snake. Text labels are rendered once per value and re-blitted only
+# when a cell under them was painted over.
+
+
+class Renderer():
+    def __init__(self, display, font, params, colors):
+        # params and colors are the GParams / ColorParams enums of the game
+        self.display = display
+        self.font = font
+        self.block = params.BLOCK_SIZE.value
+        self.offset = params.IB_OFFSET.value
+        self.inner = params.INNER_BLOCK.value
+        self.black = colors.BLACK.value
+        self.white = colors.WHITE.value
+        self.body = (colors.BLUE.value, colors.SKYBLUE.value)
+        self.food_colors = (colors.RED.value, colors.LIGHTRED.value)
+        # label position -> (text, surface, rect)
+        self.labels = {}
+        self.reset()
+
+    def reset(self):
+        # forget what is on screen, the next draw repaints everything
+        self.frame = None
+        self.tail = None
+        self.food = None
+
+    def _paint(self, pt, colors):
+        x = pt.x * self.block
+        y = pt.y * self.block
+        rect = pygame.Rect(x, y, self.block, self.block)
+        self.display.fill(colors[0], rect)
+        self.display.fill(
+            colors[1],
+            (x + self.offset, y + self.offset, self.inner, self.inner)
+        )
+        return rect
+
+    def _clear(self, pt):
+        rect = pygame.Rect(
+            pt.x * self.block,
+            pt.y * self.block,
+            self.block,
+            self.block
+        )
+        self.display.fill(self.black, rect)
+        return rect
+
+    def _restore(self, game, rect):
+        # repaint the board under a label, clipped to the label
+        self.display.set_clip(rect)
+        self.display.fill(self.black)
+        for y in range(rect.top // self.block,
+                       (rect.bottom - 1) // self.block + 1):
+            for x in range(rect.left // self.block,
+                           (rect.right - 1) // self.block + 1):
+                if not (0 <= x < game.cols and 0 <= y < game.rows):
+                    continue
+                pt = Point(x, y)
+                if game.grid[y * game.cols + x]:
+                    self._paint(pt, self.body)
+                elif pt == game.food:
+                    self._paint(pt, self.food_colors)
+        self.display.set_clip(None)
+
+    def _draw_labels(self, game, labels, dirty):
+        # labels is a list of (text, (x, y)), only changed texts are
+        # rendered again
+        rects = []
+        for text, position in labels:
+            cached = self.labels.get(position)
+            if cached is not None and cached[0] == text:
+                _, surface, rect = cached
+                if rect.collidelist(dirty) == -1:
+                    continue
+            else:
+                surface = self.font.render(text, True, self.white)
+                rect = surface.get_rect(topleft=position)
+                self.labels[position] = (text, surface, rect)
+                if cached is not None:
+                    # a shorter text must not leave the old one behind
+                    rect = rect.union(cached[2])
+            self._restore(game, rect)
+            self.display.blit(surface, position)
+            rects.append(rect)
+        return rects
+
+    def redraw(self, game, labels):
+        self.display.fill(self.black)
+        for pt in game.snake:
+            self._paint(pt, self.body)
+        self._paint(game.food, self.food_colors)
+        self.labels = {}
+        self._draw_labels(game, labels, [])
+        pygame.display.flip()
+        self.frame = game.frame_iteration
+        self.tail = game.snake[-1]
+        self.food = game.food
+
+    def draw(self, game, labels):
+        # anything but the step right after the last drawn one repaints
+        # the whole board
+        if self.frame is None or game.frame_iteration != self.frame + 1:
+            return self.redraw(game, labels)
+        dirty = []
+        # the tail cell left behind, unless the snake still covers it
+        tail = self.tail
+        if not game.grid[tail.y * game.cols + tail.x]:
+            dirty.append(self._clear(tail))
+        dirty.append(self._paint(game.snake[0], self.body))
+        if game.food != self.food:
+            # the eaten food is under the head already
+            dirty.append(self._paint(game.food, self.food_colors))
+        dirty += self._draw_labels(game, labels, dirty)
+        pygame.display.update(dirty)
+        self.frame = game.frame_iteration
+        self.tail = game.snake[-1]
+        self.food = game.food
@@ -0,0 +1,173 @@
+import numpy as np
+from train.packing import pack_transitions
+from train.packing import unpack_transitions
+
+# Replay memory backed by a preallocated NumPy array of bit packed
+# transitions, 4 bytes each (see train/packing.py). Writes go round a
+# circular cursor in O(1) and sampling draws a vector of indices, so the
+# cost of both is independent of how full the buffer is.
+
+
+class ReplayBuffer():
+    def __init__(self, capacity, state_size, seed=None):
+        self.capacity = capacity
+        self.state_size = state_size
+        self.transitions = np.zeros(capacity, dtype=np.uint32)
+        self.rng = np.random.default_rng(seed)
+        self.cursor = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def state_dict(self):
+        # arrays are handed out by reference, copy before mutating again
+        return dict(
+            arrays=dict(transitions=self.transitions),
+            cursor=self.cursor,
+            size=self.size,
+            rng=self.rng.bit_generator.state
+        )
+
+    def load_state_dict(self, state):
+        self.transitions[:] = state['arrays']['transitions']
+        self.cursor = state['cursor']
+        self.size = state['size']
+        self.rng.bit_generator.state = state['rng']
+
+    def push(self, state, action, reward, next_state, done):
+        # actions arrive one hot [straight, right, left], keep the index
+        i = self.cursor
+        self.transitions[i] = pack_transitions(
+            state, np.argmax(action), reward, next_state, done
+        )
+        self.cursor = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return i
+
+    def push_batch(self, states, actions, rewards, next_states, dones):
+        # actions here are already indices, one per row
+        return self.push_packed(
+            pack_transitions(states, actions, rewards, next_states, dones)
+        )
+
+    def push_packed(self, packed):
+        idx = (self.cursor + np.arange(len(packed))) % self.capacity
+        self.transitions[idx] = packed
+        self.cursor = (self.cursor + len(packed)) % self.capacity
+        self.size = min(self.size + len(packed), self.capacity)
+        return idx
+
+    def sample(self, batch_size):
+        if self.size > batch_size:
+            idx = self.rng.integers(0, self.size, batch_size)
+        else:
+            idx = np.arange(self.size)
+        return self.batch(idx)
+
+    def batch(self, idx):
+        # only the sampled rows are unpacked, into fresh contiguous arrays
+        # ready for torch.from_numpy
+        return unpack_transitions(self.transitions[idx])
+
+
+class SumTree():
+    # Binary tree over a power of two number of leaves where every node
+    # holds the sum of its children. Updates and prefix sum lookups walk
+    # one root to leaf path, O(log n), and are vectorized over batches.
+    def __init__(self, capacity):
+        self.leaves = 1
+        while self.leaves < capacity:
+            self.leaves *= 2
+        self.tree = np.zeros(2 * self.leaves, dtype=np.float64)
+
+    def total(self):
+        return self.tree[1]
+
+    def update(self, idx, priorities):
+        nodes = np.asarray(idx) + self.leaves
+        self.tree[nodes] = priorities
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            nodes = np.unique(nodes // 2)
+
+    def set(self, i, priority):
+        # a single leaf, walked up with plain ints : per level numpy calls
+        # would cost far more than the sums themselves
+        tree = self.tree
+        node = int(i) + self.leaves
+        tree[node] = priority
+        node //= 2
+        while node:
+            tree[node] = tree[2 * node] + tree[2 * node + 1]
+            node //= 2
+
+    def find(self, values):
+        # index of the leaf where the running sum first reaches each value
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        while nodes[0] < self.leaves:
+            left = self.tree[2 * nodes]
+            go_right = values > left
+            values -= left * go_right
+            nodes = 2 * nodes + go_right
+        return nodes - self.leaves
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    # Samples transitions proportionally to priority ** alpha, where the
+    # priority is the last absolute TD error seen for the transition, and
+    # hands back importance sampling weights correcting for that bias.
+    def __init__(self, capacity, state_size, alpha=0.6, beta=0.4,
+                 beta_steps=10_000, eps=1e-5, seed=None):
+        super().__init__(capacity, state_size, seed=seed)
+        self.tree = SumTree(capacity)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = (1.0 - beta) / beta_steps
+        self.eps = eps
+        self.max_priority = 1.0
+
+    def state_dict(self):
+        state = super().state_dict()
+        state['arrays']['tree'] = self.tree.tree
+        state['beta'] = self.beta
+        state['max_priority'] = self.max_priority
+        return state
+
+    def load_state_dict(self, state):
+        self.tree.tree[:] = state['arrays']['tree']
+        super().load_state_dict(state)
+        self.beta = state['beta']
+        self.max_priority = state['max_priority']
+
+    def push(self, state, action, reward, next_state, done):
+        i = super().push(state, action, reward, next_state, done)
+        # new transitions enter with the highest priority seen so far
+        self.tree.set(i, self.max_priority ** self.alpha)
+        return i
+
+    def push_packed(self, packed):
+        idx = super().push_packed(packed)
+        self.tree.update(idx, self.max_priority ** self.alpha)
+        return idx
+
+    def sample(self, batch_size):
+        batch_size = min(batch_size, self.size)
+        # one draw per equal slice of the total priority mass
+        bounds = self.tree.total() / batch_size
+        values = np.arange(batch_size) + self.rng.random(batch_size)
+        idx = self.tree.find(values * bounds)
+        idx = np.minimum(idx, self.size - 1)
+
+        probs = self.tree.tree[idx + self.tree.leaves] / self.tree.total()
+        weights = (self.size * probs) ** -self.beta
+        weights = (weights / weights.max()).astype(np.float32)
+        self.beta = min(1.0, self.beta + self.beta_increment)
+        return self.batch(idx) + (idx, weights)
+
+    def update_priorities(self, idx, td_errors):
+        priorities = np.abs(td_errors) + self.eps
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(idx, priorities ** self.alpha)
@@ -0,0 +1,103 @@
+import argparse
+import os
+import numpy as np
+import torch
+from train.packing import pack_transitions
+from train.packing import unpack_to_tensors
+from train.storage import create_log
+
+# Persistent replay store. Transitions are bit packed uint32 records (the
+# layout of train/packing.py) appended to a single file behind a small
+# header. Writers open the file with O_APPEND and write whole batches in
+# one call, so any number of collector processes can append to the same
+# store, and readers map it with numpy.memmap and sample without copying
+# the file.
+
+MAGIC = b'SNAKERP2'
+RECORD = np.dtype('<u4')
+HEADER_SIZE = 16
+
+
+def _header():
+    return MAGIC + RECORD.itemsize.to_bytes(8, 'little')
+
+
+class ReplayStore():
+    def __init__(self, path):
+        self.path = path
+        create_log(path, _header())
+        self.fd = None
+
+    def append(self, states, actions, rewards, next_states, dones):
+        # actions are indices, one transition per row
+        self.append_packed(
+            pack_transitions(states, actions, rewards, next_states, dones)
+        )
+
+    def append_packed(self, packed):
+        if self.fd is None:
+            self.fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+        os.write(self.fd, np.asarray(packed, dtype=RECORD).tobytes())
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def records(self):
+        # zero copy view of every complete record written so far
+        with open(self.path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        if header != _header():
+            raise ValueError('{} is not a replay store'.format(self.path))
+        count = (os.path.getsize(self.path) - HEADER_SIZE) // RECORD.itemsize
+        if count == 0:
+            return np.empty(0, dtype=RECORD)
+        return np.memmap(
+            self.path,
+            dtype=RECORD,
+            mode='r',
+            offset=HEADER_SIZE,
+            shape=(count,)
+        )
+
+    def __len__(self):
+        return len(self.records())
+
+
+def pretrain(path, steps, batch_size=1000, seed=0):
+    # fit Linear_QNet on stored transitions only, no game involved
+    from train.agent import Agent
+    from train.agent import ACTION_SIZE
+
+    records = ReplayStore(path).records()
+    rng = np.random.default_rng(seed)
+    agent = Agent()
+    for step in range(1, steps + 1):
+        idx = np.sort(rng.integers(0, len(records), batch_size))
+        states, actions, rewards, next_states, dones = unpack_to_tensors(
+            records[idx]
+        )
+        td_errors = agent.trainer.train_step(
+            states,
+            torch.nn.functional.one_hot(actions, ACTION_SIZE),
+            rewards,
+            next_states,
+            dones
+        )
+        if step % 1000 == 0:
+            print('Step : ', step, end=" | ")
+            print('TD error : ', float(td_errors.mean()))
+    agent.model.save('pretrained.pth')
+    return agent.model
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', help='replay store file')
+    parser.add_argument('--steps', type=int, default=10_000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+    print('Transitions : ', len(ReplayStore(args.path)))
+    torch.manual_seed(0)
+    pretrain(args.path, args.steps, args.batch_size)
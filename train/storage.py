@@ -0,0 +1,30 @@
+import os
+import tempfile
+
+# Append only logs shared by the replay store and the episode recordings :
+# a file made of a small header followed by records that any number of
+# processes append with O_APPEND.
+
+
+def create_log(path, header):
+    # Create the log at `path` holding only `header`, unless it exists. The
+    # header is written to a temporary file and hard linked into place, so
+    # a concurrent writer never sees the log without its header.
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    if os.path.exists(path):
+        return
+    fd, tmp = tempfile.mkstemp(
+        prefix=os.path.basename(path) + '.',
+        dir=folder or '.'
+    )
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+        try:
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+    finally:
+        os.unlink(tmp)
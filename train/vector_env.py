@@ -0,0 +1,131 @@
+import numpy as np
+from train.core import COLS
+from train.core import ROWS
+from train.features import DX
+from train.features import DY
+from train.features import get_states
+
+# Batched snake environment. N boards live side by side in NumPy arrays and
+# are all stepped with a single call, so the per-step Python overhead is
+# paid once per batch instead of once per board.
+#
+# Cells are addressed by a flat index y * cols + x. Directions follow the
+# clock wise order used by SnakeCore : right, down, left, up.
+# action index [straight, right, left] -> change of clock wise index
+TURN = np.array([0, 1, -1], dtype=np.int64)
+
+
+class VectorSnakeEnv():
+    def __init__(self, num_envs, cols=COLS, rows=ROWS, seed=None):
+        # the starting body lies 3 cells wide from the middle of the board
+        if cols < 4 or rows < 1:
+            raise ValueError(
+                'board of {} x {} cells is too small, the snake needs at '
+                'least 4 x 1'.format(cols, rows)
+            )
+        self.num_envs = num_envs
+        self.cols = cols
+        self.rows = rows
+        self.size = self.cols * self.rows
+        self.rng = np.random.default_rng(seed)
+
+        # occupancy grid and ring buffer of body cells per board
+        self.grid = np.zeros((num_envs, self.size), dtype=np.uint8)
+        self.body = np.zeros((num_envs, self.size), dtype=np.int64)
+        self.head_ptr = np.zeros(num_envs, dtype=np.int64)
+        self.length = np.zeros(num_envs, dtype=np.int64)
+
+        self.direction = np.zeros(num_envs, dtype=np.int64)
+        self.food = np.zeros(num_envs, dtype=np.int64)
+        self.score = np.zeros(num_envs, dtype=np.int64)
+        self.frame_iteration = np.zeros(num_envs, dtype=np.int64)
+        # episode length of every board that finished on the last step
+        self.final_frames = np.zeros(num_envs, dtype=np.int64)
+        self._envs = np.arange(num_envs)
+        self.reset()
+
+    def reset(self, mask=None):
+        if mask is None:
+            idx = self._envs
+        else:
+            idx = np.flatnonzero(mask)
+        if len(idx) > 0:
+            # head in the middle of the board, body trailing to the left
+            head = (self.rows // 2) * self.cols + self.cols // 2
+            cells = np.array([head - 2, head - 1, head])
+            self.grid[idx] = 0
+            self.grid[idx[:, None], cells] = 1
+            self.body[idx, :3] = cells
+            self.head_ptr[idx] = 2
+            self.length[idx] = 3
+            self.direction[idx] = 0
+            self.score[idx] = 0
+            self.frame_iteration[idx] = 0
+            self._place_food(idx)
+        return self.get_states()
+
+    def _place_food(self, idx):
+        # pick the k-th free cell of every board in one pass
+        free = self.grid[idx] == 0
+        counts = free.sum(axis=1)
+        k = (self.rng.random(len(idx)) * counts).astype(np.int64)
+        cell = (np.cumsum(free, axis=1) <= k[:, None]).sum(axis=1)
+        # a completely filled board has nowhere left to put food
+        self.food[idx] = np.where(counts > 0, cell, -1)
+
+    def _heads(self):
+        head = self.body[self._envs, self.head_ptr]
+        return head % self.cols, head // self.cols
+
+    def _blocked(self, x, y):
+        out = (x < 0) | (x >= self.cols) | (y < 0) | (y >= self.rows)
+        cell = np.where(out, 0, y * self.cols + x)
+        return out | (self.grid[self._envs, cell] > 0), cell
+
+    def step(self, actions):
+        envs = self._envs
+        self.frame_iteration += 1
+
+        # 1. move
+        self.direction = (self.direction + TURN[actions]) % 4
+        hx, hy = self._heads()
+        hit, cell = self._blocked(
+            hx + DX[self.direction],
+            hy + DY[self.direction]
+        )
+
+        # 2. check if game over
+        timeout = self.frame_iteration > 100 * (self.length + 1)
+        dones = hit | timeout
+        alive = ~dones
+        ate = alive & (cell == self.food)
+        rewards = np.where(dones, -10, np.where(ate, 10, 0))
+
+        # 3. push the new head on every surviving board
+        idx = envs[alive]
+        ptr = (self.head_ptr[idx] + 1) % self.size
+        self.head_ptr[idx] = ptr
+        self.body[idx, ptr] = cell[idx]
+        self.grid[idx, cell[idx]] = 1
+
+        # 4. place new food or just move
+        idx = envs[alive & ~ate]
+        tail = self.body[idx, (self.head_ptr[idx] - self.length[idx])
+                         % self.size]
+        self.grid[idx, tail] = 0
+
+        idx = envs[ate]
+        if len(idx) > 0:
+            self.length[idx] += 1
+            self.score[idx] += 1
+            self._place_food(idx)
+
+        # 5. auto reset finished boards, reporting their final score
+        scores = self.score.copy()
+        self.final_frames[dones] = self.frame_iteration[dones]
+        if dones.any():
+            self.reset(dones)
+        return self.get_states(), rewards, dones, scores
+
+    def get_states(self, out=None):
+        return get_states(self, out)